@@ -19,12 +19,38 @@ License: See LICENSE file
 __version__ = "1.0.0"
 __author__ = "FaceAuth Development Team"
 
-# Import key classes and functions for easy access
-from .enrollment import FaceEnroller, FaceEnrollmentError, enroll_new_user
-from .authentication import FaceAuthenticator, FaceAuthenticationError
-from .crypto import SecureEmbeddingStorage, CryptoError
-from .file_handler import encrypt_file, decrypt_file, FileEncryptionError
-from .gui import FaceAuthGUI
+import importlib
+
+# Key classes and functions are exported lazily (PEP 562) so that importing a
+# lightweight submodule such as faceauth.crypto does not pull in DeepFace,
+# TensorFlow, OpenCV and tkinter through this package __init__.
+_LAZY_EXPORTS = {
+    'FaceEnroller': '.enrollment',
+    'FaceEnrollmentError': '.enrollment',
+    'enroll_new_user': '.enrollment',
+    'FaceAuthenticator': '.authentication',
+    'FaceAuthenticationError': '.authentication',
+    'SecureEmbeddingStorage': '.crypto',
+    'CryptoError': '.crypto',
+    'encrypt_file': '.file_handler',
+    'decrypt_file': '.file_handler',
+    'FileEncryptionError': '.file_handler',
+    'FaceAuthGUI': '.gui',
+}
+
+
+def __getattr__(name):
+    """Import exported names from their submodule on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
 
 # Define what gets imported with "from faceauth import *"
 __all__ = [
@@ -23,8 +23,8 @@ import os
 from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
 import getpass
+from functools import lru_cache
 from deepface import DeepFace
-from scipy.spatial.distance import cosine
 import hashlib
 
 from .crypto import SecureEmbeddingStorage, CryptoError
@@ -35,6 +35,23 @@ class FaceAuthenticationError(Exception):
     pass
 
 
+# Margin added around a Haar-cascade face box (as a fraction of its size)
+# before DeepFace re-detects and aligns the face inside the region
+_FACE_REGION_MARGIN = 0.5
+
+
+@lru_cache(maxsize=None)
+def _load_recognition_model(model_name: str):
+    """
+    Build the DeepFace recognition model once per process.
+    
+    DeepFace.represent looks models up in the same cache that build_model
+    fills, so loading it here up front keeps the multi-second model load
+    out of the timed verification loop.
+    """
+    return DeepFace.build_model(model_name)
+
+
 class FaceAuthenticator:
     """
     Real-time face authentication class that compares live video feed
@@ -59,6 +76,15 @@ class FaceAuthenticator:
         self.frame_skip = 2  # Process every nth frame for performance
         self.frame_counter = 0
         
+        # Haar cascade for quick face pre-filtering, loaded on first use
+        self._face_cascade = None
+        
+        # Run detection through OpenCV's transparent API (OpenCL) when available
+        self._use_opencl = cv2.ocl.useOpenCL()
+        
+        # Pre-rendered status HUD regions keyed by overlay state
+        self._hud_cache: Dict[tuple, list] = {}
+        
         # Visual feedback colors (BGR format)
         self.color_verifying = (0, 255, 255)    # Yellow
         self.color_success = (0, 255, 0)        # Green
@@ -86,9 +112,9 @@ class FaceAuthenticator:
             FaceAuthenticationError: If loading fails
         """
         try:
-            # Use the secure storage to load embedding
-            embedding = self.storage.load_user_embedding(user_id, password)
-            return embedding
+            # Use the secure storage to load embedding; it reuses keys derived
+            # for earlier successful loads, so repeat loads skip PBKDF2
+            return self.storage.load_user_embedding(user_id, password)
             
         except CryptoError as e:
             if "No face data found" in str(e):
@@ -103,12 +129,56 @@ class FaceAuthenticator:
         except Exception as e:
             raise FaceAuthenticationError(f"Failed to load face data: {str(e)}")
 
-    def generate_live_embedding(self, frame: np.ndarray) -> np.ndarray:
+    def clear_cache(self) -> None:
+        """Forget the derived keys cached by the embedding storage."""
+        self.storage.clear_key_cache()
+
+    def warm_up_model(self) -> None:
+        """
+        Load the face recognition model before verification starts.
+        
+        Raises:
+            FaceAuthenticationError: If the model cannot be loaded
+        """
+        try:
+            _load_recognition_model(self.model_name)
+        except Exception as e:
+            raise FaceAuthenticationError(f"Failed to load face recognition model: {str(e)}")
+
+    def extract_face_region(self, frame: np.ndarray, face) -> np.ndarray:
+        """
+        Crop the area around a detected face, with a margin on every side.
+        
+        The region is small enough to make DeepFace's detection cheap but
+        keeps the whole face and its surroundings, so detection and
+        alignment inside it match what enrollment does on the full frame.
+        
+        Args:
+            frame: OpenCV frame containing the face
+            face: Face rectangle as [x, y, w, h]
+            
+        Returns:
+            Face region as a NumPy array (a view into frame)
+        """
+        x, y, w, h = (int(v) for v in face)
+        pad_x, pad_y = int(w * _FACE_REGION_MARGIN), int(h * _FACE_REGION_MARGIN)
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(frame_w, x + w + pad_x), min(frame_h, y + h + pad_y)
+        if x1 <= x0 or y1 <= y0:
+            raise FaceAuthenticationError('NO_FACE_DETECTED')
+        return frame[y0:y1, x0:x1]
+
+    def generate_live_embedding(self, frame: np.ndarray, face=None) -> np.ndarray:
         """
         Generate face embedding from a live webcam frame.
         
         Args:
             frame: OpenCV frame containing a face
+            face: Optional face rectangle [x, y, w, h] already found by
+                detect_faces_opencv; DeepFace then only searches the region
+                around it. Detection and alignment still run exactly as in
+                enrollment, so live and stored embeddings stay comparable.
             
         Returns:
             Face embedding as NumPy array
@@ -117,22 +187,28 @@ class FaceAuthenticator:
             FaceAuthenticationError: If embedding generation fails
         """
         try:
-            # Generate embedding using DeepFace
+            image = frame if face is None else self.extract_face_region(frame, face)
+            
+            # Generate embedding using DeepFace, with the same detector and
+            # alignment settings as enrollment
             embedding = DeepFace.represent(
-                img_path=frame,
+                img_path=image,
                 model_name=self.model_name,
                 enforce_detection=True,
                 detector_backend='opencv'
             )
             
-            # Extract the embedding vector
+            # Extract the embedding vector as float32 (half the size of float64,
+            # and plenty of precision for cosine similarity)
             if isinstance(embedding, list) and len(embedding) > 0:
-                embedding_vector = np.array(embedding[0]['embedding'])
+                embedding_vector = np.array(embedding[0]['embedding'], dtype=np.float32)
             else:
-                embedding_vector = np.array(embedding['embedding'])
+                embedding_vector = np.array(embedding['embedding'], dtype=np.float32)
             
             return embedding_vector
             
+        except FaceAuthenticationError:
+            raise
         except Exception as e:
             error_msg = str(e).lower()
             if 'face could not be detected' in error_msg:
@@ -142,25 +218,31 @@ class FaceAuthenticator:
             else:
                 raise FaceAuthenticationError(f'EMBEDDING_ERROR: {str(e)}')
 
-    def compare_embeddings(self, embedding1: np.ndarray, embedding2: np.ndarray) -> Dict[str, float]:
+    def compare_embeddings(self, embedding1: np.ndarray, embedding2: np.ndarray,
+                           embedding1_normalized: bool = False) -> Dict[str, float]:
         """
         Compare two face embeddings using cosine similarity.
         
         Args:
             embedding1: First face embedding
             embedding2: Second face embedding
+            embedding1_normalized: Whether embedding1 is already a unit vector
+                (e.g. a stored embedding normalized once per session)
             
         Returns:
             Dictionary with similarity score and verification result
         """
         try:
             # Normalize embeddings to unit vectors
-            embedding1_norm = embedding1 / np.linalg.norm(embedding1)
+            if embedding1_normalized:
+                embedding1_norm = embedding1
+            else:
+                embedding1_norm = embedding1 / np.linalg.norm(embedding1)
             embedding2_norm = embedding2 / np.linalg.norm(embedding2)
             
-            # Calculate cosine similarity (1 - cosine distance)
-            cosine_distance = cosine(embedding1_norm, embedding2_norm)
-            similarity = 1 - cosine_distance
+            # Cosine similarity of unit vectors is their dot product
+            similarity = float(np.dot(embedding1_norm, embedding2_norm))
+            cosine_distance = 1 - similarity
             
             # Convert to percentage confidence
             confidence = max(0, min(100, similarity * 100))
@@ -179,23 +261,57 @@ class FaceAuthenticator:
         except Exception as e:
             raise FaceAuthenticationError(f"Embedding comparison failed: {str(e)}")
 
-    def verify_face_against_stored(self, frame: np.ndarray, stored_embedding: np.ndarray) -> Dict[str, Any]:
+    def compare_embeddings_batch(self, query: np.ndarray, gallery: np.ndarray,
+                                 gallery_normalized: bool = False) -> np.ndarray:
+        """
+        Compare one face embedding against many stored embeddings at once.
+        
+        Uses a single matrix-vector product instead of one comparison per
+        stored embedding, for 1:N matching against several enrolled users.
+        
+        Args:
+            query: Face embedding of shape (D,)
+            gallery: Stored face embeddings of shape (N, D)
+            gallery_normalized: Whether every gallery row is already a unit
+                vector, in which case the per-row norms are not recomputed
+            
+        Returns:
+            Cosine similarity of the query to each stored embedding, shape (N,)
+        """
+        try:
+            gallery = np.asarray(gallery, dtype=np.float32)
+            query = np.asarray(query, dtype=np.float32)
+            query_norm = query / np.linalg.norm(query)
+            similarities = gallery @ query_norm
+            if not gallery_normalized:
+                similarities /= np.linalg.norm(gallery, axis=1)
+            return similarities
+            
+        except Exception as e:
+            raise FaceAuthenticationError(f"Embedding comparison failed: {str(e)}")
+
+    def verify_face_against_stored(self, frame: np.ndarray, stored_embedding: np.ndarray,
+                                   stored_normalized: bool = False, face=None) -> Dict[str, Any]:
         """
         Verify current frame against stored face embedding.
         
         Args:
             frame: Current webcam frame
             stored_embedding: Stored face embedding
+            stored_normalized: Whether stored_embedding is already a unit vector
+            face: Optional face rectangle [x, y, w, h] detected in this frame
             
         Returns:
             Dictionary containing verification result and confidence
         """
         try:
             # Generate live embedding from frame
-            live_embedding = self.generate_live_embedding(frame)
+            live_embedding = self.generate_live_embedding(frame, face)
             
             # Compare embeddings
-            comparison_result = self.compare_embeddings(stored_embedding, live_embedding)
+            comparison_result = self.compare_embeddings(
+                stored_embedding, live_embedding, embedding1_normalized=stored_normalized
+            )
             
             return comparison_result
             
@@ -205,19 +321,27 @@ class FaceAuthenticator:
         except Exception as e:
             return {'error': f'VERIFICATION_ERROR: {str(e)}'}
 
-    def draw_verification_overlay(self, frame: np.ndarray, faces: list = None) -> np.ndarray:
+    def _get_status_color(self) -> Tuple[int, int, int]:
+        """Choose the overlay color for the current status."""
+        if "ACCESS GRANTED" in self.current_status:
+            return self.color_success
+        elif "ACCESS DENIED" in self.current_status:
+            return self.color_denied
+        elif "VERIFYING" in self.current_status:
+            return self.color_verifying
+        else:
+            return self.color_info
+
+    def _draw_hud(self, canvas: np.ndarray, width: int, height: int,
+                  color: Tuple[int, int, int], paint: Optional[int] = None) -> None:
         """
-        Draw verification status overlay on the frame.
+        Draw the static status HUD onto a canvas.
         
-        Args:
-            frame: OpenCV frame to draw on
-            faces: List of detected faces (optional)
-            
-        Returns:
-            Frame with overlay
+        When paint is given, every element is drawn in that single value so the
+        same call can produce the coverage mask for the HUD layer.
         """
-        height, width = frame.shape[:2]
-        overlay = frame.copy()
+        def pick(element_color):
+            return element_color if paint is None else paint
         
         # Draw status text
         status_text = self.current_status
@@ -225,47 +349,31 @@ class FaceAuthenticator:
         text_x = (width - text_size[0]) // 2
         text_y = 50
         
-        # Choose color based on status
-        if "ACCESS GRANTED" in status_text:
-            color = self.color_success
-        elif "ACCESS DENIED" in status_text:
-            color = self.color_denied
-        elif "VERIFYING" in status_text:
-            color = self.color_verifying
-        else:
-            color = self.color_info
-        
         # Draw text background
-        cv2.rectangle(overlay, (text_x - 10, text_y - 35), 
-                     (text_x + text_size[0] + 10, text_y + 10), (0, 0, 0), -1)
+        cv2.rectangle(canvas, (text_x - 10, text_y - 35), 
+                     (text_x + text_size[0] + 10, text_y + 10), pick((0, 0, 0)), -1)
         
         # Draw text
-        cv2.putText(overlay, status_text, (text_x, text_y), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, color, 2)
+        cv2.putText(canvas, status_text, (text_x, text_y), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, pick(color), 2)
         
         # Draw confidence score if available
-        if hasattr(self, 'confidence_score') and self.confidence_score > 0:
+        if self.confidence_score > 0:
             conf_text = f"Confidence: {self.confidence_score:.1f}%"
-            cv2.putText(overlay, conf_text, (10, height - 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.color_info, 2)
+            cv2.putText(canvas, conf_text, (10, height - 30), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, pick(self.color_info), 2)
         
         # Draw similarity threshold info
         threshold_text = f"Threshold: {self.similarity_threshold:.1f} ({self.similarity_threshold*100:.0f}%)"
-        cv2.putText(overlay, threshold_text, (10, height - 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, self.color_info, 1)
+        cv2.putText(canvas, threshold_text, (10, height - 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, pick(self.color_info), 1)
         
         # Draw center crosshair for guidance
         center_x, center_y = width // 2, height // 2
-        cv2.line(overlay, (center_x - 20, center_y), (center_x + 20, center_y), 
-                self.color_info, 2)
-        cv2.line(overlay, (center_x, center_y - 20), (center_x, center_y + 20), 
-                self.color_info, 2)
-        
-        # Draw face rectangles if provided
-        if faces:
-            for face in faces:
-                x, y, w, h = face
-                cv2.rectangle(overlay, (x, y), (x + w, y + h), color, 2)
+        cv2.line(canvas, (center_x - 20, center_y), (center_x + 20, center_y), 
+                pick(self.color_info), 2)
+        cv2.line(canvas, (center_x, center_y - 20), (center_x, center_y + 20), 
+                pick(self.color_info), 2)
         
         # Add instructions
         instructions = [
@@ -275,8 +383,78 @@ class FaceAuthenticator:
         ]
         
         for i, instruction in enumerate(instructions):
-            cv2.putText(overlay, instruction, (10, height - 140 + i * 25), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, self.color_info, 1)
+            cv2.putText(canvas, instruction, (10, height - 140 + i * 25), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, pick(self.color_info), 1)
+
+    def _get_hud_regions(self, width: int, height: int) -> list:
+        """
+        Return the pre-rendered HUD regions for the current state.
+        
+        The HUD only changes when the status, confidence or threshold change,
+        so it is rendered once per state and reused for every frame. Only the
+        horizontal bands the HUD touches are kept, each as a (rows, cols,
+        inverse alpha, premultiplied colors) tuple ready for blending.
+        """
+        key = (width, height, self.current_status,
+               round(self.confidence_score, 1), self.similarity_threshold)
+        regions = self._hud_cache.get(key)
+        if regions is None:
+            color = self._get_status_color()
+            
+            # Drawing on black gives premultiplied colors; drawing the same
+            # elements in a single value gives their (anti-aliased) coverage
+            layer = np.zeros((height, width, 3), dtype=np.uint8)
+            mask = np.zeros((height, width), dtype=np.uint8)
+            self._draw_hud(layer, width, height, color)
+            self._draw_hud(mask, width, height, color, paint=255)
+            
+            # Split the covered rows into contiguous bands and crop each band
+            # to the columns it actually uses
+            regions = []
+            rows = np.flatnonzero(mask.any(axis=1))
+            band_breaks = np.flatnonzero(np.diff(rows) > 1) + 1
+            for band in np.split(rows, band_breaks):
+                if len(band) == 0:
+                    continue
+                row_slice = slice(band[0], band[-1] + 1)
+                cols = np.flatnonzero(mask[row_slice].any(axis=0))
+                col_slice = slice(cols[0], cols[-1] + 1)
+                inverse_alpha = cv2.cvtColor(255 - mask[row_slice, col_slice], cv2.COLOR_GRAY2BGR)
+                regions.append((row_slice, col_slice, inverse_alpha,
+                                layer[row_slice, col_slice].copy()))
+            
+            # Bound the cache; states repeat, so a reset is rarely needed
+            if len(self._hud_cache) >= 64:
+                self._hud_cache.clear()
+            self._hud_cache[key] = regions
+        return regions
+
+    def draw_verification_overlay(self, frame: np.ndarray, faces: list = None) -> np.ndarray:
+        """
+        Draw verification status overlay on the frame.
+        
+        Args:
+            frame: OpenCV frame to draw on
+            faces: List of detected faces (optional)
+            
+        Returns:
+            Frame with overlay
+        """
+        height, width = frame.shape[:2]
+        overlay = frame.copy()
+        
+        # Alpha-blend the cached HUD onto the frame, touching only its bands
+        for row_slice, col_slice, inverse_alpha, colors in self._get_hud_regions(width, height):
+            region = overlay[row_slice, col_slice]
+            cv2.multiply(region, inverse_alpha, dst=region, scale=1 / 255.0)
+            cv2.add(region, colors, dst=region)
+        
+        # Draw face rectangles if provided
+        if faces:
+            color = self._get_status_color()
+            for face in faces:
+                x, y, w, h = face
+                cv2.rectangle(overlay, (x, y), (x + w, y + h), color, 2)
         
         return overlay
 
@@ -292,14 +470,18 @@ class FaceAuthenticator:
             List of detected face rectangles
         """
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Load cascade classifier
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            # Convert to grayscale, on the OpenCL device if one is in use
+            src = cv2.UMat(frame) if self._use_opencl else frame
+            gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+            
+            # Load cascade classifier once and reuse it for every frame
+            if self._face_cascade is None:
+                self._face_cascade = cv2.CascadeClassifier(
+                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+                )
             
             # Detect faces
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = self._face_cascade.detectMultiScale(gray, 1.1, 4)
             
             return faces.tolist() if len(faces) > 0 else []
             
@@ -339,6 +521,14 @@ class FaceAuthenticator:
             stored_embedding = self.load_stored_embedding(user_id, password)
             print(f"✅ Face data loaded successfully ({len(stored_embedding)} dimensions)")
             
+            # Normalize the stored embedding once for the whole session
+            # instead of on every verification attempt
+            stored_embedding = stored_embedding / np.linalg.norm(stored_embedding)
+            
+            # Load the recognition model before the verification timer starts
+            print(f"🧠 Loading {self.model_name} model...")
+            self.warm_up_model()
+            
             # Initialize webcam
             print("📹 Starting webcam...")
             cap = cv2.VideoCapture(0)
@@ -365,6 +555,7 @@ class FaceAuthenticator:
             self.current_status = "VERIFYING..."
             last_verification_time = 0
             verification_interval = 1.0  # Verify every 1 second
+            faces = None
             
             while True:
                 ret, frame = cap.read()
@@ -380,19 +571,24 @@ class FaceAuthenticator:
                     self.current_status = "TIMEOUT"
                     break
                 
-                # Detect faces for visual feedback
-                faces = self.detect_faces_opencv(frame)
-                
-                # Skip frames for performance
+                # Detect faces for visual feedback on every frame_skip-th frame
+                # and reuse the last detection on the frames in between
                 self.frame_counter += 1
+                detected = faces is None or self.frame_counter % self.frame_skip == 0
+                if detected:
+                    faces = self.detect_faces_opencv(frame)
                 current_time = time.time()
                 
                 # Perform verification at intervals
                 if (current_time - last_verification_time) >= verification_interval:
+                    # The face region is cropped from this frame, so its box must be current
+                    if not detected:
+                        faces = self.detect_faces_opencv(frame)
+                    
                     if len(faces) == 1:
                         # Attempt verification with direct embedding comparison
                         verification_result = self.verify_face_against_stored(
-                            frame, stored_embedding
+                            frame, stored_embedding, stored_normalized=True, face=faces[0]
                         )
                         
                         if 'error' not in verification_result:
@@ -459,6 +655,8 @@ class FaceAuthenticator:
             if cap is not None:
                 cap.release()
             cv2.destroyAllWindows()
+            # Derived keys must not outlive the verification session
+            self.clear_cache()
 
 
 def verify_user_face(user_id: str = None, model_name: str = "Facenet", 
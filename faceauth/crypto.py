@@ -15,11 +15,13 @@ Security Features:
 
 import os
 import hashlib
+import threading
 import numpy as np
-from typing import Optional
+from typing import Dict, Optional
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 import pickle
 
@@ -29,6 +31,34 @@ class CryptoError(Exception):
     pass
 
 
+# Plaintext header for raw embedding serialization: 4-byte magic followed by
+# the NumPy dtype string padded to 4 bytes. Older files hold a pickle instead,
+# which never starts with this magic (pickle protocol 2+ starts with 0x80).
+_RAW_MAGIC = b'FAE\x01'
+_RAW_HEADER_SIZE = 8
+_RAW_DTYPES = ('<f4', '<f8')
+
+
+def _serialize_embedding(embedding: np.ndarray) -> bytes:
+    """Serialize an embedding as a raw header + little-endian float buffer."""
+    dtype = embedding.dtype.newbyteorder('<').str if isinstance(embedding, np.ndarray) else None
+    if dtype in _RAW_DTYPES and embedding.ndim == 1:
+        header = _RAW_MAGIC + dtype.encode('ascii').ljust(4, b'\0')
+        return header + np.ascontiguousarray(embedding, dtype=dtype).tobytes()
+    # Anything else (unusual dtypes or shapes) keeps the generic format
+    return pickle.dumps(embedding)
+
+
+def _deserialize_embedding(buffer: bytearray, length: int) -> np.ndarray:
+    """Rebuild an embedding from the first ``length`` bytes of a plaintext buffer."""
+    if buffer[:4] == _RAW_MAGIC:
+        dtype = np.dtype(bytes(buffer[4:_RAW_HEADER_SIZE]).rstrip(b'\0').decode('ascii'))
+        count = (length - _RAW_HEADER_SIZE) // dtype.itemsize
+        # View straight into the (writable) decryption buffer, no parse or copy
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=_RAW_HEADER_SIZE)
+    return pickle.loads(memoryview(buffer)[:length])
+
+
 def generate_key_from_password(password: str, salt: bytes = None) -> tuple:
     """
     Generate a cryptographic key from a password using PBKDF2.
@@ -69,50 +99,37 @@ def encrypt_embedding(embedding: np.ndarray, key: bytes) -> bytes:
     """
     try:
         # Serialize the embedding
-        embedding_bytes = pickle.dumps(embedding)
+        embedding_bytes = _serialize_embedding(embedding)
         
         # Generate random nonce (12 bytes for GCM)
         nonce = os.urandom(12)
         
-        # Create cipher
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.GCM(nonce),
-            backend=default_backend()
-        )
-        encryptor = cipher.encryptor()
-        
-        # Encrypt the data
-        ciphertext = encryptor.update(embedding_bytes) + encryptor.finalize()
+        # One-shot AEAD call (OpenSSL EVP, AES-NI + carry-less multiply GHASH);
+        # returns ciphertext with the authentication tag already appended
+        ciphertext_and_tag = AESGCM(key).encrypt(nonce, embedding_bytes, None)
         
         # Combine nonce + ciphertext + authentication tag
-        encrypted_data = nonce + ciphertext + encryptor.tag
-        
-        return encrypted_data
+        return nonce + ciphertext_and_tag
         
     except Exception as e:
         raise CryptoError(f"Encryption failed: {str(e)}")
 
 
-def decrypt_embedding(encrypted_data: bytes, password: str) -> np.ndarray:
+def decrypt_embedding_with_key(encrypted_payload: bytes, key: bytes,
+                               out: Optional[np.ndarray] = None) -> np.ndarray:
     """
-    Decrypt a face embedding using the user's password.
+    Decrypt a face embedding using an already-derived key.
     
     Args:
-        encrypted_data: Encrypted embedding data
-        password: User password
+        encrypted_payload: Encrypted data without the salt (nonce + ciphertext + tag)
+        key: 256-bit encryption key
+        out: Optional preallocated array to write the embedding into; must
+            have the embedding's shape
         
     Returns:
-        Decrypted face embedding as NumPy array
+        Decrypted face embedding as NumPy array (``out`` if given)
     """
     try:
-        # Extract salt from the beginning of the data
-        salt = encrypted_data[:16]
-        encrypted_payload = encrypted_data[16:]
-        
-        # Derive key from password
-        key, _ = generate_key_from_password(password, salt)
-        
         # Extract components
         nonce = encrypted_payload[:12]
         tag = encrypted_payload[-16:]
@@ -126,16 +143,49 @@ def decrypt_embedding(encrypted_data: bytes, password: str) -> np.ndarray:
         )
         decryptor = cipher.decryptor()
         
-        # Decrypt the data
-        embedding_bytes = decryptor.update(ciphertext) + decryptor.finalize()
+        # Decrypt the data into a single preallocated buffer
+        plaintext = bytearray(len(ciphertext) + 15)
+        length = decryptor.update_into(ciphertext, plaintext)
+        decryptor.finalize()
         
-        # Deserialize the embedding
-        embedding = pickle.loads(embedding_bytes)
+        # Deserialize the embedding (only after the tag has been verified)
+        embedding = _deserialize_embedding(plaintext, length)
         
+    except Exception as e:
+        raise CryptoError(f"Decryption failed: {str(e)}")
+    
+    if out is None:
         return embedding
+    if out.shape != embedding.shape:
+        raise CryptoError(f"Output array has shape {out.shape}, expected {embedding.shape}")
+    np.copyto(out, embedding)
+    return out
+
+
+def decrypt_embedding(encrypted_data: bytes, password: str,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decrypt a face embedding using the user's password.
+    
+    Args:
+        encrypted_data: Encrypted embedding data
+        password: User password
+        out: Optional preallocated array to write the embedding into
+        
+    Returns:
+        Decrypted face embedding as NumPy array (``out`` if given)
+    """
+    try:
+        # Extract salt from the beginning of the data
+        salt = encrypted_data[:16]
+        
+        # Derive key from password
+        key, _ = generate_key_from_password(password, salt)
         
     except Exception as e:
         raise CryptoError(f"Decryption failed: {str(e)}")
+    
+    return decrypt_embedding_with_key(encrypted_data[16:], key, out=out)
 
 
 def encrypt_embedding_with_password(embedding: np.ndarray, password: str) -> bytes:
@@ -211,11 +261,13 @@ def verify_embedding_integrity(embedding: np.ndarray) -> bool:
         if len(embedding.shape) != 1 or embedding.shape[0] < 64 or embedding.shape[0] > 4096:
             return False
         
-        # Check if it contains reasonable values (not all zeros or NaN)
-        if np.all(embedding == 0) or np.any(np.isnan(embedding)) or np.any(np.isinf(embedding)):
+        # Check if it contains reasonable values: one isfinite pass covers
+        # both NaN and inf, and any() reduces without a comparison temporary
+        if not np.isfinite(embedding).all():
             return False
         
-        return True
+        # Not all zeros
+        return bool(embedding.any())
         
     except Exception:
         return False
@@ -226,6 +278,15 @@ class SecureEmbeddingStorage:
     High-level interface for secure embedding storage operations.
     """
     
+    # Derived keys memoized per (password, salt), shared by every instance in
+    # the process so that e.g. an enroller and an authenticator reuse keys.
+    # Lookup ids are BLAKE2b digests keyed with a per-process secret, so the
+    # cache never holds passwords or fast unkeyed password hashes.
+    _key_cache: Dict[bytes, bytes] = {}
+    _key_cache_secret = os.urandom(32)
+    _key_cache_lock = threading.Lock()
+    _KEY_CACHE_MAX_ENTRIES = 128
+    
     def __init__(self, storage_dir: str = "face_data"):
         """
         Initialize secure storage.
@@ -236,6 +297,57 @@ class SecureEmbeddingStorage:
         self.storage_dir = storage_dir
         os.makedirs(storage_dir, exist_ok=True)
     
+    def _key_cache_id(self, password: str, salt: bytes) -> bytes:
+        """Return the key-cache lookup id for a password and salt."""
+        return hashlib.blake2b(
+            password.encode('utf-8'),
+            digest_size=16,
+            key=self._key_cache_secret,
+            salt=salt
+        ).digest()
+    
+    def _derive_key(self, password: str, salt: bytes) -> bytes:
+        """
+        Derive the encryption key for a password and salt, reusing a cached key.
+        
+        Only keys that have been used successfully are cached (see callers), so
+        a wrong password always goes through the full PBKDF2 derivation.
+        
+        Args:
+            password: User password
+            salt: 16-byte salt stored with the encrypted data
+            
+        Returns:
+            256-bit encryption key
+        """
+        with self._key_cache_lock:
+            key = self._key_cache.get(self._key_cache_id(password, salt))
+        if key is None:
+            key, _ = generate_key_from_password(password, salt)
+        return key
+    
+    def _remember_key(self, password: str, salt: bytes, key: bytes) -> None:
+        """Cache a derived key that has been used successfully."""
+        with self._key_cache_lock:
+            if len(self._key_cache) >= self._KEY_CACHE_MAX_ENTRIES:
+                self._key_cache.clear()
+            self._key_cache[self._key_cache_id(password, salt)] = key
+    
+    @classmethod
+    def clear_key_cache(cls) -> None:
+        """
+        Drop all memoized derived keys (shared by all instances).
+        
+        FaceAuthenticator.verify_user_face calls this when it finishes and the
+        GUI calls it when its window closes, so keys do not outlive a session.
+        """
+        with cls._key_cache_lock:
+            cls._key_cache.clear()
+    
+    def _user_path(self, user_id: str) -> str:
+        """Return the path of the encrypted face data file for a user."""
+        return os.path.join(self.storage_dir, f"{generate_user_hash(user_id)}_face.dat")
+    
     def save_user_embedding(self, user_id: str, embedding: np.ndarray, password: str) -> str:
         """
         Save user embedding securely.
@@ -251,17 +363,17 @@ class SecureEmbeddingStorage:
         if not verify_embedding_integrity(embedding):
             raise CryptoError("Invalid embedding data")
         
-        # Generate secure filename
-        user_hash = generate_user_hash(user_id)
-        filename = f"{user_hash}_face.dat"
-        filepath = os.path.join(self.storage_dir, filename)
+        filepath = self._user_path(user_id)
         
         # Encrypt and save
-        encrypted_data = encrypt_embedding_with_password(embedding, password)
+        key, salt = generate_key_from_password(password)
+        encrypted_data = salt + encrypt_embedding(embedding, key)
         
         with open(filepath, 'wb') as f:
             f.write(encrypted_data)
         
+        self._remember_key(password, salt, key)
+        
         return filepath
     
     def load_user_embedding(self, user_id: str, password: str) -> np.ndarray:
@@ -275,39 +387,45 @@ class SecureEmbeddingStorage:
         Returns:
             Decrypted face embedding
         """
-        # Generate secure filename
-        user_hash = generate_user_hash(user_id)
-        filename = f"{user_hash}_face.dat"
-        filepath = os.path.join(self.storage_dir, filename)
-        
-        if not os.path.exists(filepath):
+        # Open directly rather than checking existence first: one filesystem
+        # call instead of two, and no race between the check and the read
+        filepath = self._user_path(user_id)
+        try:
+            with open(filepath, 'rb') as f:
+                encrypted_data = f.read()
+        except FileNotFoundError:
             raise CryptoError(f"No face data found for user: {user_id}")
         
-        # Load and decrypt
-        with open(filepath, 'rb') as f:
-            encrypted_data = f.read()
+        salt = encrypted_data[:16]
+        try:
+            key = self._derive_key(password, salt)
+        except Exception as e:
+            raise CryptoError(f"Decryption failed: {str(e)}")
         
-        embedding = decrypt_embedding(encrypted_data, password)
+        embedding = decrypt_embedding_with_key(encrypted_data[16:], key)
         
         if not verify_embedding_integrity(embedding):
             raise CryptoError("Corrupted or invalid embedding data")
         
+        # Key authenticated the data, so later loads can skip PBKDF2
+        self._remember_key(password, salt, key)
+        
         return embedding
     
     def user_exists(self, user_id: str) -> bool:
         """
         Check if a user's face data exists.
         
+        Always checks the filesystem, so files written or deleted by other
+        storage instances or processes are reported correctly.
+        
         Args:
             user_id: User identifier
             
         Returns:
             True if user exists
         """
-        user_hash = generate_user_hash(user_id)
-        filename = f"{user_hash}_face.dat"
-        filepath = os.path.join(self.storage_dir, filename)
-        return os.path.exists(filepath)
+        return os.path.exists(self._user_path(user_id))
 
 
 # Security explanation and best practices
@@ -321,20 +439,29 @@ Security Implementation Explanation:
 2. **Key Derivation**: PBKDF2 with SHA-256 and 100,000 iterations makes brute-force 
    attacks computationally expensive. Each user gets a unique random salt.
 
-3. **No Password Storage**: Passwords are never stored. Only the derived encryption 
-   keys are used, and they're derived fresh each time from the password.
+3. **No Password Storage**: Passwords are never stored, on disk or in memory.
+   Encryption keys are derived from the password with the file's salt.
+
+4. **Derived-Key Cache**: After a key has successfully decrypted (or encrypted)
+   a user's data, SecureEmbeddingStorage keeps it in memory so later loads skip
+   PBKDF2. The cache is shared by all storage instances in the process and holds
+   at most 128 keys. Entries are looked up by a BLAKE2b MAC of the password and
+   salt under a per-process random secret, so the cache holds no password or
+   password hash, and a wrong password is never cached. The cache is emptied
+   by SecureEmbeddingStorage.clear_key_cache(), which runs when a face
+   verification finishes (successful or not) and when the GUI window closes.
 
-4. **Face Reconstruction Prevention**: 
+5. **Face Reconstruction Prevention**: 
    - Face embeddings are mathematical representations (vectors) of facial features
    - They cannot be directly converted back to images
    - Even if decrypted, embeddings only contain abstract numerical features
    - The original training data and model architecture would be needed for any 
      potential reconstruction, which is practically impossible
 
-5. **Data Integrity**: Each encrypted file includes authentication tags to detect 
+6. **Data Integrity**: Each encrypted file includes authentication tags to detect 
    tampering or corruption.
 
-6. **Secure Random**: Uses cryptographically secure random number generation for 
+7. **Secure Random**: Uses cryptographically secure random number generation for 
    salts and nonces.
 
 Why This Prevents Face Reconstruction:
@@ -308,11 +308,11 @@ class FaceEnroller:
                 detector_backend='opencv'
             )
             
-            # Extract the embedding vector
+            # Extract the embedding vector; float32 halves the stored size
             if isinstance(embedding, list) and len(embedding) > 0:
-                embedding_vector = np.array(embedding[0]['embedding'])
+                embedding_vector = np.array(embedding[0]['embedding'], dtype=np.float32)
             else:
-                embedding_vector = np.array(embedding['embedding'])
+                embedding_vector = np.array(embedding['embedding'], dtype=np.float32)
             
             print(f"✅ Embedding generated successfully (dimension: {len(embedding_vector)})")
             return embedding_vector
@@ -22,16 +22,15 @@ File Format (.faceauth):
 - Bytes 72+: Encrypted file content + authentication tag
 """
 
+import hmac
 import os
 import struct
 from pathlib import Path
 from typing import Tuple
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 
-from .crypto import CryptoError
+from .crypto import CryptoError, generate_key_from_password
 
 
 class FileEncryptionError(Exception):
@@ -52,7 +51,7 @@ def generate_file_key() -> bytes:
 def derive_key_from_password(password: str, salt: bytes = None) -> Tuple[bytes, bytes]:
     """
     Derive a cryptographic key from password using PBKDF2.
-    Uses same parameters as crypto.py for consistency.
+    Delegates to crypto.generate_key_from_password so parameters stay in sync.
     
     Args:
         password: User password
@@ -61,19 +60,9 @@ def derive_key_from_password(password: str, salt: bytes = None) -> Tuple[bytes,
     Returns:
         Tuple of (key, salt)
     """
-    if salt is None:
-        salt = os.urandom(16)  # 128-bit salt
-    
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,  # 256-bit key
-        salt=salt,
-        iterations=100000,  # Same as crypto.py
-        backend=default_backend()
-    )
-    
-    key = kdf.derive(password.encode('utf-8'))
-    return key, salt
+    # Share crypto.py's derivation so both modules run the same OpenSSL
+    # PBKDF2-HMAC-SHA256 (which uses the CPU's SHA extensions when present)
+    return generate_key_from_password(password, salt)
 
 
 def encrypt_file_key(file_key: bytes, password_key: bytes) -> bytes:
@@ -679,8 +668,8 @@ def validate_encryption_integrity(file_path: str, password: str) -> bool:
         with open(decrypted_path, 'rb') as f:
             decrypted_data = f.read()
         
-        # Compare
-        integrity_check = original_data == decrypted_data
+        # Compare in constant time; the contents are the user's plaintext
+        integrity_check = hmac.compare_digest(original_data, decrypted_data)
         
         # Cleanup test files
         os.remove(encrypted_path)
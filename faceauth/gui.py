@@ -614,7 +614,12 @@ class FaceAuthGUI:
     def run(self):
         """Start the GUI application."""
         self.update_status("🚀 FaceAuth GUI Started", "All systems ready")
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # Drop derived keys cached during the session once the window closes
+            from .crypto import SecureEmbeddingStorage
+            SecureEmbeddingStorage.clear_key_cache()
 
 
 def main():
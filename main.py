@@ -23,8 +23,6 @@ from pathlib import Path
 # Add current directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from faceauth.enrollment import enroll_new_user, FaceEnrollmentError
-
 
 @click.group(invoke_without_command=True)
 @click.version_option(version="1.0.0")
@@ -108,9 +106,13 @@ def enroll_face(user_id, model, data_dir):
     click.echo("🚀 Starting FaceAuth enrollment process...")
     click.echo("=" * 60)
     
+    # An empty tuple matches no exception. It keeps the handler below valid
+    # if the import itself fails (missing package, Ctrl-C mid-import, ...)
+    FaceEnrollmentError = ()
+    
     try:
         # Import here to avoid issues if dependencies aren't installed
-        from faceauth.enrollment import FaceEnroller
+        from faceauth.enrollment import FaceEnroller, FaceEnrollmentError
         
         # Create enroller instance
         enroller = FaceEnroller(model_name=model, data_dir=data_dir)
@@ -629,11 +631,13 @@ def info():
     
     # Check if face_data directory exists
     face_data_dir = Path("face_data")
-    if face_data_dir.exists():
-        face_files = list(face_data_dir.glob("*_face.dat"))
+    try:
+        # Single directory scan: no separate exists() check or list of Paths
+        with os.scandir(face_data_dir) as entries:
+            enrolled_count = sum(1 for entry in entries if entry.name.endswith("_face.dat"))
         click.echo(f"📁 Face data directory: {face_data_dir.absolute()}")
-        click.echo(f"👥 Enrolled users: {len(face_files)}")
-    else:
+        click.echo(f"👥 Enrolled users: {enrolled_count}")
+    except FileNotFoundError:
         click.echo("📁 Face data directory: Not created yet")
         click.echo("👥 Enrolled users: 0")
     
@@ -688,6 +692,7 @@ def setup():
     Run this command whenever you encounter dependency errors.
     """
     import subprocess
+    from collections import deque
     click.echo("🛠️ FaceAuth Environment Repair & Setup")
     click.echo("=" * 50)
     click.echo("This will clean your environment and install all dependencies correctly.")
@@ -719,9 +724,11 @@ def setup():
     # Step 2: Upgrade pip
     click.echo("\n📦 Step 2: Upgrading pip to latest version...")
     try:
+        # Only the return code and error text are used, so stdout is discarded
+        # rather than captured and decoded
         result_pip = subprocess.run([
             sys.executable, "-m", "pip", "install", "--upgrade", "pip"
-        ], capture_output=True, text=True, check=False)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
         
         if result_pip.returncode == 0:
             click.echo("✅ pip upgraded successfully!")
@@ -747,16 +754,22 @@ def setup():
     click.echo("📦 Installing from requirements.txt...")
     
     try:
-        result = subprocess.run([
+        # Stream the installation log as it is produced instead of buffering
+        # the whole pip output; only the last lines are kept for error details
+        process = subprocess.Popen([
             sys.executable, "-m", "pip", "install", "-r", "requirements.txt"
-        ], capture_output=True, text=True, check=False)
-        
-        # Show installation output
-        if result.stdout.strip():
-            click.echo("Installation log:")
-            click.echo(result.stdout)
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        
+        recent_lines = deque(maxlen=20)
+        click.echo("Installation log:")
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            recent_lines.append(line)
+            click.echo(line)
+        process.stdout.close()
+        returncode = process.wait()
             
-        if result.returncode == 0:
+        if returncode == 0:
             click.echo("\n🎉 SETUP COMPLETE!")
             click.echo("✅ All dependencies are freshly installed and ready")
             click.echo("🔧 Environment repair successful")
@@ -773,7 +786,7 @@ def setup():
         else:
             click.echo("\n❌ CRITICAL ERROR: Dependency installation failed")
             click.echo("Error details:")
-            click.echo(result.stderr)
+            click.echo("\n".join(recent_lines))
             click.echo("\n� Troubleshooting:")
             click.echo("1. Ensure you have an active internet connection")
             click.echo("2. Try manually: pip install -r requirements.txt")
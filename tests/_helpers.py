@@ -0,0 +1,47 @@
+"""
+Test Helpers for FaceAuth
+=========================
+
+Plain helper functions shared by the test modules (not fixtures).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+# Frame geometry used for mocked webcam frames
+FRAME_SHAPE = (480, 640, 3)
+
+
+def batch_cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity between every row of ``a`` and every row of ``b``.
+
+    Computes the full similarity matrix with a single matrix product, as a
+    vectorised reference for per-pair comparisons.
+
+    Args:
+        a: Array of shape (N, D)
+        b: Array of shape (M, D)
+
+    Returns:
+        Array of shape (N, M) with cosine similarities
+    """
+    a_norm = np.linalg.norm(a, axis=1, keepdims=True)
+    b_norm = np.linalg.norm(b, axis=1, keepdims=True)
+    return (a @ b.T) / (a_norm * b_norm.T)
+
+
+@lru_cache(maxsize=None)
+def create_test_frame() -> np.ndarray:
+    """
+    Create a deterministic mock webcam frame.
+
+    The frame is built once and returned read-only; callers that need to
+    draw on it must take a copy.
+    """
+    rng = np.random.default_rng(0xCAFE)
+    frame = rng.integers(0, 255, FRAME_SHAPE, dtype=np.uint8)
+    frame.flags.writeable = False
+    return frame
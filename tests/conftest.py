@@ -0,0 +1,275 @@
+"""
+Shared Test Fixtures for FaceAuth
+=================================
+
+Fixtures shared across the FaceAuth test modules. Heavy or repeated setup
+(random embeddings, mocked OpenCV calls, shared instances) lives here so
+individual test modules stay focused on behaviour.
+"""
+
+import functools
+import importlib
+from unittest.mock import MagicMock, patch, DEFAULT
+
+import pytest
+import numpy as np
+
+from tests._helpers import create_test_frame
+
+
+# Number of unit embeddings held in the shared embedding bank
+EMBEDDING_BANK_SIZE = 16
+EMBEDDING_DIM = 512
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    """
+    Run every test from its own temporary working directory.
+
+    Components default to relative data directories such as "face_data";
+    isolating the working directory keeps tests from writing into the
+    checkout and from sharing state when run in parallel under pytest-xdist.
+    """
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture(scope="session")
+def mock_embedding_bank():
+    """
+    Bank of unit-normalised mock face embeddings.
+
+    All embeddings are generated and normalised in a single vectorised call,
+    so tests that need many users index into this matrix instead of building
+    vectors one by one.
+    """
+    rng = np.random.default_rng(0xFACE)
+    bank = rng.standard_normal((EMBEDDING_BANK_SIZE, EMBEDDING_DIM), dtype=np.float32)
+    bank /= np.linalg.norm(bank, axis=1, keepdims=True)
+    bank.flags.writeable = False
+    return bank
+
+
+@pytest.fixture
+def mock_embedding(mock_embedding_bank):
+    """Single unit-normalised mock embedding (first row of the bank)."""
+    return mock_embedding_bank[0].copy()
+
+
+@pytest.fixture(scope="session")
+def _shared_authenticator(tmp_path_factory):
+    """Single FaceAuthenticator instance shared by the whole test session."""
+    from faceauth.authentication import FaceAuthenticator
+    return FaceAuthenticator(data_dir=str(tmp_path_factory.mktemp("face_data")))
+
+
+@pytest.fixture
+def authenticator(_shared_authenticator):
+    """
+    Shared FaceAuthenticator with its tunable and status state reset.
+
+    Tests that change thresholds or status on the instance get a clean copy
+    of the defaults without constructing a new authenticator each time.
+    """
+    _shared_authenticator.verification_timeout = 15.0
+    _shared_authenticator.similarity_threshold = 0.6
+    _shared_authenticator.frame_counter = 0
+    _shared_authenticator.current_status = "INITIALIZING"
+    _shared_authenticator.verification_result = None
+    _shared_authenticator.confidence_score = 0.0
+    _shared_authenticator._face_cascade = None
+    _shared_authenticator._hud_cache.clear()
+    _shared_authenticator.clear_cache()
+    return _shared_authenticator
+
+
+@pytest.fixture(scope="session")
+def encryption_key():
+    """
+    256-bit key derived once per session for tests that exercise the cipher.
+
+    Key derivation runs 100,000 PBKDF2 iterations; tests that only need some
+    valid key share this one instead of deriving their own.
+    """
+    from faceauth.crypto import generate_key_from_password
+    key, _ = generate_key_from_password("test_password")
+    return key
+
+
+@pytest.fixture
+def secure_storage(tmp_path):
+    """SecureEmbeddingStorage backed by a fresh per-test directory."""
+    from faceauth.crypto import SecureEmbeddingStorage
+    return SecureEmbeddingStorage(str(tmp_path / "face_data"))
+
+
+@pytest.fixture(scope="session")
+def enrolled_user_record(mock_embedding_bank):
+    """
+    Encrypted face record for a test user, built once per session.
+
+    Password-based encryption runs 100,000 PBKDF2 iterations, so the blob is
+    produced a single time and written into each test's data directory by
+    enrolled_data_dir instead of being re-encrypted for every test.
+    """
+    from faceauth.crypto import encrypt_embedding_with_password, generate_user_hash
+    user_id = "test_user"
+    password = "test_password"
+    embedding = mock_embedding_bank[1].copy()
+    return {
+        'user_id': user_id,
+        'password': password,
+        'embedding': embedding,
+        'filename': f"{generate_user_hash(user_id)}_face.dat",
+        'encrypted_data': encrypt_embedding_with_password(embedding, password),
+    }
+
+
+@pytest.fixture
+def enrolled_data_dir(tmp_path, enrolled_user_record):
+    """Fresh data directory containing the precomputed enrolled user record."""
+    (tmp_path / enrolled_user_record['filename']).write_bytes(enrolled_user_record['encrypted_data'])
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def runner():
+    """
+    Click test runner shared by the whole session.
+
+    CliRunner.invoke isolates stdin/stdout per call, so one runner can be
+    reused instead of constructing a new one in every CLI test.
+    """
+    from click.testing import CliRunner
+    return CliRunner()
+
+
+@pytest.fixture(scope="session")
+def cli_help_text():
+    """
+    Help text of the top-level CLI group, rendered once per session.
+
+    Tests that only inspect the help output read this string instead of
+    going through a full CliRunner.invoke.
+    """
+    import click
+    from main import cli
+    return cli.get_help(click.Context(cli))
+
+
+@pytest.fixture
+def mock_frame():
+    """Cached read-only mock webcam frame."""
+    return create_test_frame()
+
+
+@pytest.fixture
+def mock_cv2_drawing():
+    """
+    Patch the OpenCV drawing primitives used by the verification overlay.
+
+    All functions are replaced in a single patch.multiple call; getTextSize
+    returns a fixed size so layout code can run without a real font.
+    """
+    with patch.multiple('faceauth.authentication.cv2',
+                        getTextSize=DEFAULT, rectangle=DEFAULT,
+                        putText=DEFAULT, line=DEFAULT) as mocks:
+        mocks['getTextSize'].return_value = ((200, 30), 10)
+        yield mocks
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_class_mock(target):
+    """
+    Class mock for the CLI tests, built once per target and reused.
+
+    Instances are MagicMocks with spec_set to the real class, so tests can
+    only configure methods that exist and attribute typos fail loudly. The
+    mocks are reset between tests instead of being rebuilt.
+    """
+    module_name, class_name = target.rsplit('.', 1)
+    real_class = getattr(importlib.import_module(module_name), class_name)
+    class_mock = MagicMock(name=class_name)
+    class_mock.return_value = MagicMock(spec_set=real_class, name=f"{class_name}()")
+    return class_mock
+
+
+def _reset_class_mock(class_mock):
+    """Reset a cached class mock and its instance, including configured returns."""
+    class_mock.return_value.reset_mock(return_value=True, side_effect=True)
+    class_mock.reset_mock(side_effect=True)
+
+
+@pytest.fixture(scope="class")
+def _enroller_class_patch():
+    """Patch faceauth.enrollment.FaceEnroller once for a whole test class."""
+    class_mock = _cached_class_mock('faceauth.enrollment.FaceEnroller')
+    with patch('faceauth.enrollment.FaceEnroller', class_mock):
+        yield class_mock
+
+
+@pytest.fixture(scope="class")
+def _authenticator_class_patch():
+    """Patch faceauth.authentication.FaceAuthenticator once for a whole test class."""
+    class_mock = _cached_class_mock('faceauth.authentication.FaceAuthenticator')
+    with patch('faceauth.authentication.FaceAuthenticator', class_mock):
+        yield class_mock
+
+
+@pytest.fixture
+def enroller_mock(_enroller_class_patch):
+    """
+    Cached FaceEnroller mock patched into faceauth.enrollment.
+
+    Yields the mock instance that the CLI's FaceEnroller(...) call returns;
+    configure e.g. enroller_mock.enroll_new_user.return_value in the test.
+    The patch itself stays in place for the whole class; only the mock's
+    configuration and call history are reset after each test.
+    """
+    yield _enroller_class_patch.return_value
+    _reset_class_mock(_enroller_class_patch)
+
+
+@pytest.fixture
+def authenticator_mock(_authenticator_class_patch):
+    """
+    Cached FaceAuthenticator mock patched into faceauth.authentication.
+
+    Yields the mock instance that the CLI's FaceAuthenticator(...) call
+    returns; configure e.g. authenticator_mock.verify_user_face in the test.
+    The patch itself stays in place for the whole class.
+    """
+    yield _authenticator_class_patch.return_value
+    _reset_class_mock(_authenticator_class_patch)
+
+
+class StubAuthenticator:
+    """
+    Call-tracking-free stand-in for FaceAuthenticator.
+
+    Mocks record every call and build child mocks on attribute access; tests
+    that only need a fixed verification outcome use this plain stub instead
+    and keep the Mock-based authenticator_mock for call assertions.
+    """
+
+    def __init__(self, verified):
+        self.verified = verified
+
+    def verify_user_face(self, user_id):
+        return self.verified
+
+
+@pytest.fixture
+def stub_authenticator(monkeypatch):
+    """
+    Patch FaceAuthenticator with a StubAuthenticator.
+
+    Returns a setter: stub_authenticator(True) makes every authenticator the
+    CLI constructs report a successful verification.
+    """
+    def install(verified):
+        stub = StubAuthenticator(verified)
+        monkeypatch.setattr('faceauth.authentication.FaceAuthenticator',
+                            lambda *args, **kwargs: stub)
+        return stub
+    return install
@@ -10,22 +10,18 @@ Tests for face authentication functionality in authentication.py, focusing on:
 """
 
 import pytest
+import itertools
 import numpy as np
-import os
-import tempfile
-import shutil
 from pathlib import Path
-from unittest.mock import patch, MagicMock, mock_open
-
-# Import the modules under test
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from unittest.mock import patch, MagicMock, DEFAULT
 
 from faceauth.authentication import (
     FaceAuthenticator,
-    FaceAuthenticationError
+    FaceAuthenticationError,
+    _load_recognition_model
 )
-from faceauth.crypto import SecureEmbeddingStorage
+from faceauth.crypto import generate_key_from_password
+from tests._helpers import FRAME_SHAPE, batch_cosine, create_test_frame
 
 
 class TestFaceAuthenticatorInit:
@@ -51,25 +47,105 @@ class TestFaceAuthenticatorInit:
         assert authenticator.model_name == custom_model
         assert authenticator.data_dir == Path(custom_dir)
 
+    @pytest.mark.parametrize("threshold", [
+        pytest.param(0.5, id="lenient"),
+        pytest.param(0.6, id="default"),
+        pytest.param(0.7, id="strict"),
+        pytest.param(0.9, id="paranoid"),
+    ])
+    def test_custom_threshold(self, threshold, authenticator, mock_embedding_bank):
+        """Test that a tuned similarity threshold decides verification."""
+        authenticator.similarity_threshold = threshold
+        query = mock_embedding_bank[0]
+        # Blend of two unrelated unit vectors with cosine similarity just
+        # below and just above the threshold
+        other = mock_embedding_bank[1] - np.dot(mock_embedding_bank[1], query) * query
+        other /= np.linalg.norm(other)
+        below = (threshold - 0.01) * query + np.sqrt(1 - (threshold - 0.01) ** 2) * other
+        above = (threshold + 0.01) * query + np.sqrt(1 - (threshold + 0.01) ** 2) * other
+        
+        assert not authenticator.compare_embeddings(query, below)['verified']
+        result = authenticator.compare_embeddings(query, above)
+        assert result['verified']
+        assert result['threshold'] == threshold
 
-class TestLoadStoredEmbedding:
-    """Test loading stored face embeddings."""
+    @pytest.mark.parametrize("timeout", [
+        pytest.param(3.0, id="short"),
+        pytest.param(15.0, id="default"),
+        pytest.param(30.0, id="long"),
+    ])
+    def test_verification_times_out(self, timeout, authenticator, mock_frame, mock_embedding):
+        """Test that verify_user_face gives up once the configured timeout elapses."""
+        authenticator.verification_timeout = timeout
+        clock = MagicMock()
+        # Start the timer at 0, stay inside the window for a few reads, then
+        # jump past the deadline. The reads are finite, so a loop that ignored
+        # the deadline would exhaust them and fail instead of hanging.
+        clock.time.side_effect = itertools.chain(
+            [0.0], itertools.repeat(timeout / 2, 4), itertools.repeat(timeout + 0.5, 4)
+        )
+        mock_cap = MagicMock()
+        mock_cap.isOpened.return_value = True
+        mock_cap.read.return_value = (True, mock_frame)
+        
+        with patch('faceauth.authentication.getpass.getpass', return_value="password"), \
+             patch.object(authenticator, 'load_stored_embedding', return_value=mock_embedding), \
+             patch.object(authenticator, 'warm_up_model'), \
+             patch.object(authenticator, 'detect_faces_opencv', return_value=[]), \
+             patch.object(authenticator, 'verify_face_against_stored') as mock_verify, \
+             patch('faceauth.authentication.time', clock), \
+             patch.multiple('faceauth.authentication.cv2', VideoCapture=DEFAULT, imshow=DEFAULT,
+                            waitKey=DEFAULT, destroyAllWindows=DEFAULT) as cv2_mocks:
+            cv2_mocks['VideoCapture'].return_value = mock_cap
+            cv2_mocks['waitKey'].return_value = 0
+            
+            assert authenticator.verify_user_face("test_user") is False
+        
+        assert authenticator.current_status == "TIMEOUT"
+        mock_verify.assert_not_called()
+        mock_cap.release.assert_called_once()
+        # Frames were processed before the deadline, not just after it
+        assert mock_cap.read.call_count > 1
+
+
+class TestModelLoading:
+    """Test recognition model warm-up."""
     
     def setup_method(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.authenticator = FaceAuthenticator(data_dir=self.test_dir)
-        self.user_id = "test_user"
-        self.password = "test_password"
-        self.test_embedding = np.random.rand(512).astype(np.float32)
-        
-        # Create test face data using SecureEmbeddingStorage
-        self.storage = SecureEmbeddingStorage(self.test_dir)
-        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        """Reset the process-wide model cache."""
+        _load_recognition_model.cache_clear()
     
     def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+        """Drop mocked models from the process-wide model cache."""
+        _load_recognition_model.cache_clear()
+    
+    @patch('faceauth.authentication.DeepFace.build_model')
+    def test_model_built_once_per_name(self, mock_build_model, authenticator):
+        """Test that repeated warm-ups share one model instance."""
+        authenticator.warm_up_model()
+        authenticator.warm_up_model()
+        FaceAuthenticator(data_dir=authenticator.data_dir).warm_up_model()
+        
+        mock_build_model.assert_called_once_with("Facenet")
+    
+    @patch('faceauth.authentication.DeepFace.build_model', side_effect=ValueError("unknown model"))
+    def test_model_load_failure(self, mock_build_model, authenticator):
+        """Test that model loading errors are reported as authentication errors."""
+        with pytest.raises(FaceAuthenticationError, match="Failed to load face recognition model"):
+            authenticator.warm_up_model()
+
+
+class TestLoadStoredEmbedding:
+    """Test loading stored face embeddings."""
+    
+    @pytest.fixture(autouse=True)
+    def setup_enrolled_user(self, enrolled_data_dir, enrolled_user_record):
+        """Set up test environment with a precomputed enrolled user."""
+        self.test_dir = str(enrolled_data_dir)
+        self.authenticator = FaceAuthenticator(data_dir=self.test_dir)
+        self.user_id = enrolled_user_record['user_id']
+        self.password = enrolled_user_record['password']
+        self.test_embedding = enrolled_user_record['embedding']
     
     def test_load_existing_embedding(self):
         """Test loading an existing user embedding."""
@@ -88,6 +164,64 @@ class TestLoadStoredEmbedding:
         with pytest.raises(FaceAuthenticationError, match="No face data found"):
             self.authenticator.load_stored_embedding("nonexistent_user", self.password)
     
+    def test_load_embedding_reuses_derived_key(self):
+        """Test that repeated loads reuse the storage's derived key instead of PBKDF2."""
+        self.authenticator.load_stored_embedding(self.user_id, self.password)
+        
+        with patch('faceauth.crypto.generate_key_from_password') as mock_kdf:
+            second = self.authenticator.load_stored_embedding(self.user_id, self.password)
+        
+        mock_kdf.assert_not_called()
+        assert np.allclose(self.test_embedding, second, rtol=1e-6)
+    
+    def test_load_embedding_cache_wrong_password(self):
+        """Test that a cached key is not used for a wrong password."""
+        self.authenticator.load_stored_embedding(self.user_id, self.password)
+        
+        with pytest.raises(FaceAuthenticationError, match="Incorrect password"):
+            self.authenticator.load_stored_embedding(self.user_id, "wrong_password")
+    
+    def test_load_embedding_after_reenrollment(self, mock_embedding_bank):
+        """Test that a re-enrolled embedding is returned, not a stale one."""
+        self.authenticator.load_stored_embedding(self.user_id, self.password)
+        new_embedding = mock_embedding_bank[2].copy()
+        self.authenticator.storage.save_user_embedding(self.user_id, new_embedding, self.password)
+        
+        loaded = self.authenticator.load_stored_embedding(self.user_id, self.password)
+        
+        assert np.allclose(loaded, new_embedding, rtol=1e-6)
+    
+    def test_clear_cache(self):
+        """Test that clearing the cache forces a fresh key derivation."""
+        self.authenticator.load_stored_embedding(self.user_id, self.password)
+        self.authenticator.clear_cache()
+        
+        with patch('faceauth.crypto.generate_key_from_password',
+                   wraps=generate_key_from_password) as mock_kdf:
+            self.authenticator.load_stored_embedding(self.user_id, self.password)
+        
+        mock_kdf.assert_called_once()
+    
+    @pytest.mark.parametrize("camera_opens", [True, False], ids=["timeout", "no-webcam"])
+    def test_verify_user_face_clears_key_cache(self, camera_opens, mock_frame):
+        """Test that derived keys are dropped when a verification session ends."""
+        self.authenticator.verification_timeout = 0
+        mock_cap = MagicMock()
+        mock_cap.isOpened.return_value = camera_opens
+        mock_cap.read.return_value = (True, mock_frame)
+        
+        with patch('faceauth.authentication.getpass.getpass', return_value=self.password), \
+             patch.object(self.authenticator, 'warm_up_model'), \
+             patch.multiple('faceauth.authentication.cv2', VideoCapture=DEFAULT, imshow=DEFAULT,
+                            waitKey=DEFAULT, destroyAllWindows=DEFAULT) as cv2_mocks:
+            cv2_mocks['VideoCapture'].return_value = mock_cap
+            try:
+                self.authenticator.verify_user_face(self.user_id)
+            except FaceAuthenticationError:
+                assert not camera_opens
+        
+        assert self.authenticator.storage._key_cache == {}
+    
     @patch('builtins.open', side_effect=PermissionError("Permission denied"))
     def test_load_embedding_permission_error(self, mock_open):
         """Test handling of file permission errors."""
@@ -98,170 +232,133 @@ class TestLoadStoredEmbedding:
 class TestFaceVerification:
     """Test face verification functionality with mocking."""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_verification(self, authenticator, mock_frame, mock_embedding_bank):
         """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.authenticator = FaceAuthenticator(data_dir=self.test_dir)
-        self.user_id = "test_user"
-        self.password = "test_password"
-        
-        # Create mock frame data
-        self.mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        self.authenticator = authenticator
+        self.mock_frame = mock_frame
+        self.stored_embedding = mock_embedding_bank[0]
+        self.other_embedding = mock_embedding_bank[1]
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
-    @patch('faceauth.authentication.cv2.imwrite')
-    @patch('faceauth.authentication.tempfile.mkstemp')
-    @patch('faceauth.authentication.os.close')
-    def test_save_frame_for_verification(self, mock_close, mock_mkstemp, mock_imwrite):
-        """Test saving frame to temporary file."""
-        # Mock tempfile creation
-        mock_mkstemp.return_value = (1, '/tmp/test_frame.jpg')
-        mock_imwrite.return_value = True
-        
-        temp_path = self.authenticator.save_frame_for_verification(self.mock_frame)
-        
-        assert temp_path == '/tmp/test_frame.jpg'
-        mock_mkstemp.assert_called_once_with(suffix='.jpg')
-        mock_close.assert_called_once_with(1)
-        mock_imwrite.assert_called_once()
-    
-    @patch('faceauth.authentication.DeepFace.verify')
-    @patch('faceauth.authentication.os.unlink')
-    @patch.object(FaceAuthenticator, 'save_frame_for_verification')
-    def test_verify_face_success(self, mock_save_frame, mock_unlink, mock_deepface_verify):
+    @patch('faceauth.authentication.DeepFace.represent')
+    def test_verify_face_success(self, mock_represent):
         """Test successful face verification."""
-        # Mock frame saving
-        mock_save_frame.return_value = '/tmp/current_frame.jpg'
-        
-        # Mock DeepFace verification - successful match
-        mock_deepface_verify.return_value = {
-            'verified': True,
-            'distance': 0.3,
-            'threshold': 0.68
-        }
+        # Mock DeepFace returning an embedding of the enrolled face
+        mock_represent.return_value = [{'embedding': self.stored_embedding.tolist()}]
         
-        stored_embedding_path = '/tmp/stored_embedding.jpg'
+        result = self.authenticator.verify_face_against_stored(self.mock_frame, self.stored_embedding)
         
-        result = self.authenticator.verify_face_against_stored(self.mock_frame, stored_embedding_path)
-        
-        assert result['verified'] is True
+        assert result['verified']
         assert 'confidence' in result
         assert result['confidence'] > 0
         assert 'distance' in result
         assert 'threshold' in result
         
-        # Verify cleanup
-        mock_unlink.assert_called_once_with('/tmp/current_frame.jpg')
+        # The raw frame is passed straight to DeepFace, no temporary image file
+        assert mock_represent.call_args.kwargs['img_path'] is self.mock_frame
     
-    @patch('faceauth.authentication.DeepFace.verify')
-    @patch('faceauth.authentication.os.unlink')
-    @patch.object(FaceAuthenticator, 'save_frame_for_verification')
-    def test_verify_face_failure(self, mock_save_frame, mock_unlink, mock_deepface_verify):
+    @patch('faceauth.authentication.DeepFace.represent')
+    def test_verify_face_failure(self, mock_represent):
         """Test failed face verification (faces don't match)."""
-        # Mock frame saving
-        mock_save_frame.return_value = '/tmp/current_frame.jpg'
-        
-        # Mock DeepFace verification - faces don't match
-        mock_deepface_verify.return_value = {
-            'verified': False,
-            'distance': 0.9,
-            'threshold': 0.68
-        }
+        # Mock DeepFace returning an embedding of a different face
+        mock_represent.return_value = [{'embedding': self.other_embedding.tolist()}]
         
-        stored_embedding_path = '/tmp/stored_embedding.jpg'
+        result = self.authenticator.verify_face_against_stored(self.mock_frame, self.stored_embedding)
         
-        result = self.authenticator.verify_face_against_stored(self.mock_frame, stored_embedding_path)
-        
-        assert result['verified'] is False
+        assert not result['verified']
         assert 'confidence' in result
         assert 'distance' in result
         assert 'threshold' in result
-        
-        # Verify cleanup
-        mock_unlink.assert_called_once_with('/tmp/current_frame.jpg')
     
-    @patch('faceauth.authentication.DeepFace.verify')
-    @patch('faceauth.authentication.os.unlink')
-    @patch.object(FaceAuthenticator, 'save_frame_for_verification')
-    def test_verify_face_no_face_detected(self, mock_save_frame, mock_unlink, mock_deepface_verify):
-        """Test verification when no face is detected."""
-        # Mock frame saving
-        mock_save_frame.return_value = '/tmp/current_frame.jpg'
+    @patch('faceauth.authentication.DeepFace.represent')
+    def test_live_embedding_is_float32(self, mock_represent):
+        """Test that live embeddings use the same float32 dtype as stored ones."""
+        mock_represent.return_value = [{'embedding': self.stored_embedding.tolist()}]
+        
+        live_embedding = self.authenticator.generate_live_embedding(self.mock_frame)
         
-        # Mock DeepFace verification - no face detected
-        mock_deepface_verify.side_effect = Exception("Face could not be detected")
+        assert live_embedding.dtype == np.float32
+        assert np.array_equal(live_embedding, self.stored_embedding)
+    
+    @patch('faceauth.authentication.DeepFace.represent')
+    def test_live_embedding_from_detected_face_region(self, mock_represent):
+        """Test that a detected face narrows the search region but keeps enrollment's preprocessing."""
+        mock_represent.return_value = [{'embedding': self.stored_embedding.tolist()}]
+        
+        result = self.authenticator.verify_face_against_stored(
+            self.mock_frame, self.stored_embedding, face=[200, 150, 100, 80]
+        )
+        
+        assert result['verified']
+        kwargs = mock_represent.call_args.kwargs
+        # Same detector and alignment as FaceEnroller._generate_embedding
+        assert kwargs['detector_backend'] == 'opencv'
+        assert kwargs['enforce_detection'] is True
+        assert 'align' not in kwargs
+        # Face box padded by half its size on every side
+        assert np.array_equal(kwargs['img_path'], self.mock_frame[110:270, 150:350])
+    
+    def test_extract_face_region_clamps_to_frame(self):
+        """Test that padded face regions extending past the frame edge are clamped."""
+        region = self.authenticator.extract_face_region(self.mock_frame, [600, 440, 100, 100])
         
-        stored_embedding_path = '/tmp/stored_embedding.jpg'
+        assert region.shape == (FRAME_SHAPE[0] - 390, FRAME_SHAPE[1] - 550, 3)
         
-        result = self.authenticator.verify_face_against_stored(self.mock_frame, stored_embedding_path)
+        with pytest.raises(FaceAuthenticationError, match="NO_FACE_DETECTED"):
+            self.authenticator.extract_face_region(self.mock_frame, [700, 10, 50, 50])
+    
+    @patch('faceauth.authentication.DeepFace.represent',
+           side_effect=Exception("Face could not be detected"))
+    def test_verify_face_no_face_detected(self, mock_represent):
+        """Test verification when no face is detected."""
+        result = self.authenticator.verify_face_against_stored(self.mock_frame, self.stored_embedding)
         
         assert 'error' in result
         assert result['error'] == 'NO_FACE_DETECTED'
-        
-        # Verify cleanup
-        mock_unlink.assert_called_once_with('/tmp/current_frame.jpg')
     
-    @patch('faceauth.authentication.DeepFace.verify')
-    @patch('faceauth.authentication.os.unlink')
-    @patch.object(FaceAuthenticator, 'save_frame_for_verification')
-    def test_verify_face_multiple_faces(self, mock_save_frame, mock_unlink, mock_deepface_verify):
+    @patch('faceauth.authentication.DeepFace.represent',
+           side_effect=Exception("More than one face detected"))
+    def test_verify_face_multiple_faces(self, mock_represent):
         """Test verification when multiple faces are detected."""
-        # Mock frame saving
-        mock_save_frame.return_value = '/tmp/current_frame.jpg'
-        
-        # Mock DeepFace verification - multiple faces
-        mock_deepface_verify.side_effect = Exception("More than one face detected")
-        
-        stored_embedding_path = '/tmp/stored_embedding.jpg'
-        
-        result = self.authenticator.verify_face_against_stored(self.mock_frame, stored_embedding_path)
+        result = self.authenticator.verify_face_against_stored(self.mock_frame, self.stored_embedding)
         
         assert 'error' in result
         assert result['error'] == 'MULTIPLE_FACES'
-        
-        # Verify cleanup
-        mock_unlink.assert_called_once_with('/tmp/current_frame.jpg')
     
-    @patch('faceauth.authentication.DeepFace.verify')
-    @patch('faceauth.authentication.os.unlink')
-    @patch.object(FaceAuthenticator, 'save_frame_for_verification')
-    def test_verify_face_general_error(self, mock_save_frame, mock_unlink, mock_deepface_verify):
+    @patch('faceauth.authentication.DeepFace.represent',
+           side_effect=Exception("Model loading failed"))
+    def test_verify_face_general_error(self, mock_represent):
         """Test verification with general error."""
-        # Mock frame saving
-        mock_save_frame.return_value = '/tmp/current_frame.jpg'
-        
-        # Mock DeepFace verification - general error
-        mock_deepface_verify.side_effect = Exception("Model loading failed")
-        
-        stored_embedding_path = '/tmp/stored_embedding.jpg'
-        
-        result = self.authenticator.verify_face_against_stored(self.mock_frame, stored_embedding_path)
+        result = self.authenticator.verify_face_against_stored(self.mock_frame, self.stored_embedding)
         
         assert 'error' in result
-        assert 'VERIFICATION_ERROR' in result['error']
+        assert 'EMBEDDING_ERROR' in result['error']
         assert 'Model loading failed' in result['error']
-        
-        # Verify cleanup
-        mock_unlink.assert_called_once_with('/tmp/current_frame.jpg')
 
 
 class TestFaceDetection:
     """Test face detection functionality."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.authenticator = FaceAuthenticator()
-        self.mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    @pytest.fixture(autouse=True)
+    def setup_authenticator(self, authenticator, mock_frame):
+        """Set up test environment with the shared authenticator and cached frame."""
+        self.authenticator = authenticator
+        self.mock_frame = mock_frame
     
-    @patch('faceauth.authentication.cv2.CascadeClassifier')
-    @patch('faceauth.authentication.cv2.cvtColor')
-    def test_detect_faces_opencv_success(self, mock_cvtcolor, mock_cascade_classifier):
+    @pytest.fixture
+    def mock_cv2_detection(self):
+        """Patch the OpenCV calls used by face detection in a single patch.multiple call."""
+        with patch.multiple('faceauth.authentication.cv2', CascadeClassifier=DEFAULT,
+                            cvtColor=DEFAULT, UMat=DEFAULT) as mocks:
+            yield mocks
+    
+    def test_detect_faces_opencv_success(self, mock_cv2_detection):
         """Test successful face detection with OpenCV."""
+        mock_cvtcolor = mock_cv2_detection['cvtColor']
+        mock_cascade_classifier = mock_cv2_detection['CascadeClassifier']
+        
         # Mock grayscale conversion
-        mock_gray = np.random.randint(0, 255, (480, 640), dtype=np.uint8)
+        mock_gray = np.zeros(FRAME_SHAPE[:2], dtype=np.uint8)
         mock_cvtcolor.return_value = mock_gray
         
         # Mock cascade classifier
@@ -277,12 +374,13 @@ class TestFaceDetection:
         assert len(faces) == 1
         assert faces[0] == [100, 100, 200, 200]
     
-    @patch('faceauth.authentication.cv2.CascadeClassifier')
-    @patch('faceauth.authentication.cv2.cvtColor')
-    def test_detect_faces_opencv_no_faces(self, mock_cvtcolor, mock_cascade_classifier):
+    def test_detect_faces_opencv_no_faces(self, mock_cv2_detection):
         """Test face detection when no faces are found."""
+        mock_cvtcolor = mock_cv2_detection['cvtColor']
+        mock_cascade_classifier = mock_cv2_detection['CascadeClassifier']
+        
         # Mock grayscale conversion
-        mock_gray = np.random.randint(0, 255, (480, 640), dtype=np.uint8)
+        mock_gray = np.zeros(FRAME_SHAPE[:2], dtype=np.uint8)
         mock_cvtcolor.return_value = mock_gray
         
         # Mock cascade classifier
@@ -296,6 +394,17 @@ class TestFaceDetection:
         
         assert len(faces) == 0
     
+    def test_detect_faces_opencv_reuses_classifier(self, mock_cv2_detection):
+        """Test that the cascade classifier is loaded once and reused."""
+        mock_cascade_classifier = mock_cv2_detection['CascadeClassifier']
+        mock_cascade_classifier.return_value.detectMultiScale.return_value = np.array([])
+        
+        for _ in range(3):
+            self.authenticator.detect_faces_opencv(self.mock_frame)
+        
+        mock_cascade_classifier.assert_called_once()
+        assert mock_cascade_classifier.return_value.detectMultiScale.call_count == 3
+    
     @patch('faceauth.authentication.cv2.CascadeClassifier', side_effect=Exception("OpenCV error"))
     def test_detect_faces_opencv_error(self, mock_cascade_classifier):
         """Test face detection error handling."""
@@ -303,25 +412,129 @@ class TestFaceDetection:
         
         # Should return empty list on error
         assert faces == []
+    
+    def test_detect_faces_opencv_uses_umat_with_opencl(self, mock_cv2_detection):
+        """Test that frames are wrapped in a UMat only when OpenCL is enabled."""
+        mock_umat = mock_cv2_detection['UMat']
+        mock_cvtcolor = mock_cv2_detection['cvtColor']
+        mock_cascade_classifier = mock_cv2_detection['CascadeClassifier']
+        mock_cascade_classifier.return_value.detectMultiScale.return_value = np.array([[100, 100, 200, 200]])
+        
+        with patch.object(self.authenticator, '_use_opencl', True):
+            faces = self.authenticator.detect_faces_opencv(self.mock_frame)
+        
+        mock_umat.assert_called_once_with(self.mock_frame)
+        assert mock_cvtcolor.call_args[0][0] is mock_umat.return_value
+        assert faces == [[100, 100, 200, 200]]
+        
+        mock_umat.reset_mock()
+        with patch.object(self.authenticator, '_use_opencl', False):
+            self.authenticator.detect_faces_opencv(self.mock_frame)
+        
+        mock_umat.assert_not_called()
+        assert mock_cvtcolor.call_args[0][0] is self.mock_frame
+
+
+class TestEmbeddingComparison:
+    """Test direct embedding-to-embedding comparison."""
+
+    @pytest.fixture(autouse=True)
+    def setup_authenticator(self, authenticator):
+        """Set up test environment with the shared authenticator."""
+        self.authenticator = authenticator
+
+    def test_compare_identical_embeddings(self, mock_embedding):
+        """Test that an embedding matches itself with full confidence."""
+        result = self.authenticator.compare_embeddings(mock_embedding, mock_embedding)
+
+        assert result['verified']
+        assert result['similarity'] == pytest.approx(1.0, abs=1e-5)
+        assert result['confidence'] == pytest.approx(100.0, abs=1e-3)
+
+    def test_compare_different_embeddings(self, mock_embedding_bank):
+        """Test that unrelated embeddings are rejected."""
+        similarities = batch_cosine(mock_embedding_bank, mock_embedding_bank)
+        off_diagonal = similarities[~np.eye(len(mock_embedding_bank), dtype=bool)]
+
+        assert np.all(off_diagonal < self.authenticator.similarity_threshold)
+
+        # Spot-check the per-pair implementation against the batched reference
+        for j in (1, 2, 3):
+            result = self.authenticator.compare_embeddings(mock_embedding_bank[0], mock_embedding_bank[j])
+
+            assert not result['verified']
+            assert result['similarity'] == pytest.approx(similarities[0, j], abs=1e-5)
+
+    def test_compare_scaled_embedding(self, mock_embedding):
+        """Test that comparison is independent of embedding magnitude."""
+        result = self.authenticator.compare_embeddings(mock_embedding, mock_embedding * 7.5)
+
+        assert result['verified']
+        assert result['similarity'] == pytest.approx(1.0, abs=1e-5)
+
+    def test_compare_prenormalized_stored_embedding(self, mock_embedding_bank):
+        """Test that a pre-normalized stored embedding gives the same result."""
+        stored = mock_embedding_bank[0]
+        live = mock_embedding_bank[0] * 4.0 + mock_embedding_bank[1]
+
+        expected = self.authenticator.compare_embeddings(stored * 3.0, live)
+        result = self.authenticator.compare_embeddings(stored, live, embedding1_normalized=True)
+
+        assert result['similarity'] == pytest.approx(expected['similarity'], abs=1e-6)
+        assert result['verified'] == expected['verified']
+
+    def test_compare_embeddings_batch_matches_pairwise(self, mock_embedding_bank):
+        """Test that batch comparison agrees with per-pair comparison."""
+        query = mock_embedding_bank[3] * 2.0
+
+        similarities = self.authenticator.compare_embeddings_batch(query, mock_embedding_bank)
+
+        assert similarities.shape == (len(mock_embedding_bank),)
+        assert int(np.argmax(similarities)) == 3
+        for j in (0, 3, 7):
+            pair = self.authenticator.compare_embeddings(query, mock_embedding_bank[j])
+            assert similarities[j] == pytest.approx(pair['similarity'], abs=1e-5)
+
+    def test_compare_embeddings_batch_large_gallery(self, mock_embedding_bank):
+        """Test 1:N matching against a large gallery in one call."""
+        rng = np.random.default_rng(0x6A11)
+        gallery = rng.standard_normal((10_000, mock_embedding_bank.shape[1]), dtype=np.float32)
+        gallery[1234] = mock_embedding_bank[0] * 3.0
+
+        similarities = self.authenticator.compare_embeddings_batch(mock_embedding_bank[0], gallery)
+
+        assert int(np.argmax(similarities)) == 1234
+        assert similarities[1234] == pytest.approx(1.0, abs=1e-5)
+
+    def test_compare_embeddings_batch_prenormalized_gallery(self, mock_embedding_bank):
+        """Test 100 comparisons against a unit-normalized gallery in a single call."""
+        rng = np.random.default_rng(0x6A12)
+        gallery = rng.random((100, mock_embedding_bank.shape[1]), dtype=np.float32)
+        gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+        query = gallery[42] * 5.0
+
+        similarities = self.authenticator.compare_embeddings_batch(query, gallery, gallery_normalized=True)
+
+        expected = batch_cosine(query[np.newaxis, :], gallery)[0]
+        assert similarities == pytest.approx(expected, abs=1e-5)
+        assert int(np.argmax(similarities)) == 42
+
+    def test_compare_embeddings_batch_invalid_shape(self, mock_embedding):
+        """Test that mismatched dimensions raise an authentication error."""
+        with pytest.raises(FaceAuthenticationError, match="Embedding comparison failed"):
+            self.authenticator.compare_embeddings_batch(mock_embedding, np.ones((4, 128)))
 
 
 class TestVisualizationOverlay:
     """Test the visualization overlay functionality."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.authenticator = FaceAuthenticator()
-        self.mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-    
-    @patch('faceauth.authentication.cv2.getTextSize')
-    @patch('faceauth.authentication.cv2.rectangle')
-    @patch('faceauth.authentication.cv2.putText')
-    @patch('faceauth.authentication.cv2.line')
-    def test_draw_verification_overlay(self, mock_line, mock_puttext, mock_rectangle, mock_gettextsize):
+    @pytest.fixture(autouse=True)
+    def setup_authenticator(self, authenticator):
+        """Set up test environment with the shared authenticator."""
+        self.authenticator = authenticator
+    
+    def test_draw_verification_overlay(self, mock_frame, mock_cv2_drawing):
         """Test drawing verification overlay on frame."""
-        # Mock text size calculation
-        mock_gettextsize.return_value = ((200, 30), 10)
-        
         # Set some status
         self.authenticator.current_status = "VERIFYING IDENTITY"
         self.authenticator.confidence_score = 85.5
@@ -329,17 +542,45 @@ class TestVisualizationOverlay:
         # Mock faces
         faces = [[100, 100, 200, 200]]
         
-        overlay_frame = self.authenticator.draw_verification_overlay(self.mock_frame, faces)
+        overlay_frame = self.authenticator.draw_verification_overlay(mock_frame, faces)
         
         # Verify frame is returned
         assert overlay_frame is not None
-        assert overlay_frame.shape == self.mock_frame.shape
+        assert overlay_frame.shape == mock_frame.shape
         
         # Verify OpenCV functions were called
-        mock_gettextsize.assert_called()
-        mock_rectangle.assert_called()
-        mock_puttext.assert_called()
-        mock_line.assert_called()
+        for name in ('getTextSize', 'rectangle', 'putText', 'line'):
+            mock_cv2_drawing[name].assert_called()
+    
+    def test_overlay_hud_rendered_once_per_state(self, mock_frame, mock_cv2_drawing):
+        """Test that the static HUD is drawn once and reused while the state is unchanged."""
+        self.authenticator.current_status = "VERIFYING IDENTITY"
+        
+        self.authenticator.draw_verification_overlay(mock_frame)
+        calls_after_first = mock_cv2_drawing['putText'].call_count
+        self.authenticator.draw_verification_overlay(mock_frame)
+        
+        assert mock_cv2_drawing['putText'].call_count == calls_after_first
+        
+        # A new status renders a new HUD
+        self.authenticator.current_status = "ACCESS GRANTED"
+        self.authenticator.draw_verification_overlay(mock_frame)
+        
+        assert mock_cv2_drawing['putText'].call_count > calls_after_first
+    
+    def test_overlay_cached_matches_fresh_render(self, mock_frame):
+        """Test that a cached HUD produces the same pixels as a fresh render."""
+        self.authenticator.current_status = "ACCESS DENIED (Confidence: 42.0%)"
+        self.authenticator.confidence_score = 42.0
+        faces = [[100, 100, 200, 200]]
+        
+        fresh = self.authenticator.draw_verification_overlay(mock_frame, faces)
+        cached = self.authenticator.draw_verification_overlay(mock_frame, faces)
+        
+        assert np.array_equal(fresh, cached)
+        assert not np.array_equal(fresh, mock_frame)
+        # Rows untouched by the HUD and face box keep the original pixels
+        assert np.array_equal(fresh[80:95], mock_frame[80:95])
     
     def test_status_color_mapping(self):
         """Test that different statuses get different colors."""
@@ -361,21 +602,14 @@ class TestVisualizationOverlay:
 class TestAuthenticationIntegration:
     """Integration tests combining multiple components."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
+    @pytest.fixture(autouse=True)
+    def setup_enrolled_user(self, enrolled_data_dir, enrolled_user_record):
+        """Set up test environment with a precomputed enrolled user."""
+        self.test_dir = str(enrolled_data_dir)
         self.authenticator = FaceAuthenticator(data_dir=self.test_dir)
-        self.user_id = "integration_test_user"
-        self.password = "integration_password"
-        self.test_embedding = np.random.rand(512).astype(np.float32)
-        
-        # Create test face data
-        self.storage = SecureEmbeddingStorage(self.test_dir)
-        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
-    
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+        self.user_id = enrolled_user_record['user_id']
+        self.password = enrolled_user_record['password']
+        self.test_embedding = enrolled_user_record['embedding']
     
     def test_load_and_verify_workflow(self):
         """Test the complete load embedding and prepare for verification workflow."""
@@ -386,33 +620,30 @@ class TestAuthenticationIntegration:
         assert isinstance(loaded_embedding, np.ndarray)
         assert np.allclose(self.test_embedding, loaded_embedding, rtol=1e-6)
         
-        # Test reference image path creation
-        reference_path = self.authenticator.create_reference_image_from_embedding(self.user_id)
-        expected_path = str(self.authenticator.data_dir / f"{self.user_id}_reference.jpg")
-        assert reference_path == expected_path
+        # Verify a live frame of the same face against the loaded embedding
+        with patch('faceauth.authentication.DeepFace.represent') as mock_represent:
+            mock_represent.return_value = [{'embedding': self.test_embedding.tolist()}]
+            result = self.authenticator.verify_face_against_stored(create_test_frame(), loaded_embedding)
+        
+        assert result['verified']
 
 
 class TestErrorHandling:
     """Test comprehensive error handling scenarios."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
+    @pytest.fixture(autouse=True)
+    def setup_empty_data_dir(self, tmp_path):
+        """Set up test environment with an empty, per-test data directory."""
+        self.test_dir = str(tmp_path)
         self.authenticator = FaceAuthenticator(data_dir=self.test_dir)
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     def test_invalid_embedding_format(self):
         """Test handling of invalid embedding format."""
         # Create a file with invalid content
         user_id = "invalid_user"
         password = "test_password"
-        invalid_file = self.authenticator.data_dir / f"{user_id}_face.dat"
-        
-        # Create directory and write invalid data
-        invalid_file.parent.mkdir(parents=True, exist_ok=True)
+        # Write invalid data where the storage looks up this user's file
+        invalid_file = self.authenticator.storage._user_path(user_id)
         with open(invalid_file, 'wb') as f:
             f.write(b"invalid embedding data")
         
@@ -424,11 +655,17 @@ class TestErrorHandling:
         with pytest.raises(FaceAuthenticationError, match="No face data found"):
             self.authenticator.load_stored_embedding("nonexistent_user", "password")
     
-    @patch('faceauth.authentication.os.path.exists', return_value=False)
-    def test_data_directory_not_exists(self, mock_exists):
+    def test_data_directory_not_exists(self, tmp_path):
         """Test behavior when data directory doesn't exist."""
+        missing_dir = tmp_path / "missing" / "face_data"
+        authenticator = FaceAuthenticator(data_dir=str(missing_dir))
+        # Storage creates the directory on construction; remove it again so
+        # the load really runs against a directory that does not exist
+        missing_dir.rmdir()
+        missing_dir.parent.rmdir()
+        
         with pytest.raises(FaceAuthenticationError, match="No face data found"):
-            self.authenticator.load_stored_embedding("any_user", "password")
+            authenticator.load_stored_embedding("any_user", "password")
 
 
 if __name__ == "__main__":
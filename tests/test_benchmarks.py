@@ -0,0 +1,53 @@
+"""
+Benchmarks for FaceAuth Hot Paths
+=================================
+
+Micro-benchmarks for the per-frame and per-comparison code paths, using
+pytest-benchmark for warm-up and statistical rounds:
+- Embedding comparison (single pair and 1:N gallery)
+- Verification overlay rendering
+
+Skipped automatically when pytest-benchmark is not installed.
+"""
+
+import pytest
+import numpy as np
+
+pytest.importorskip("pytest_benchmark")
+
+# Gallery size for 1:N matching benchmarks
+GALLERY_SIZE = 10_000
+
+
+class TestComparisonBenchmarks:
+    """Benchmark embedding comparison."""
+    
+    def test_compare_embeddings(self, benchmark, authenticator, mock_embedding_bank):
+        """Benchmark a single embedding-to-embedding comparison."""
+        result = benchmark(authenticator.compare_embeddings,
+                           mock_embedding_bank[0], mock_embedding_bank[1])
+        
+        assert not result['verified']
+    
+    def test_compare_embeddings_batch(self, benchmark, authenticator, mock_embedding_bank):
+        """Benchmark 1:N matching against a large gallery."""
+        rng = np.random.default_rng(0xBE4C)
+        gallery = rng.standard_normal((GALLERY_SIZE, mock_embedding_bank.shape[1]), dtype=np.float32)
+        
+        similarities = benchmark(authenticator.compare_embeddings_batch,
+                                 mock_embedding_bank[0], gallery)
+        
+        assert similarities.shape == (GALLERY_SIZE,)
+
+
+class TestOverlayBenchmarks:
+    """Benchmark per-frame overlay rendering."""
+    
+    def test_draw_verification_overlay(self, benchmark, authenticator, mock_frame):
+        """Benchmark drawing the overlay on a steady-state frame."""
+        authenticator.current_status = "VERIFYING..."
+        faces = [[100, 100, 200, 200]]
+        
+        overlay = benchmark(authenticator.draw_verification_overlay, mock_frame, faces)
+        
+        assert overlay.shape == mock_frame.shape
@@ -0,0 +1,278 @@
+"""
+Unit Tests for the Command-Line Interface
+=========================================
+
+Tests for the Click commands in main.py, focusing on:
+- Help and version output
+- enroll/verify commands with mocked face components
+- encrypt/decrypt commands behind a mocked face authentication gate
+- info command output
+
+The webcam-driven FaceEnroller and FaceAuthenticator are replaced with the
+cached mocks from conftest, so no camera or model is needed.
+"""
+
+import pytest
+import sys
+from types import MappingProxyType
+from unittest.mock import patch, DEFAULT
+
+from main import cli, enroll_face, verify_face
+from faceauth import enrollment, authentication
+from faceauth.enrollment import FaceEnrollmentError
+from faceauth.authentication import FaceAuthenticationError
+
+
+# Canned results returned by the mocked components. They are built once and
+# wrapped read-only so every test can share them without copying.
+_ENROLL_OK = MappingProxyType({
+    'success': True,
+    'user_id': 'alice',
+    'file_path': 'face_data/alice_face.dat',
+    'model_used': 'Facenet',
+    'embedding_size': 128,
+})
+_ENROLL_FAILED = MappingProxyType({'success': False})
+_FILE_INFO_VALID = MappingProxyType({
+    'file_path': 'secret.txt.faceauth', 'file_size': 9, 'is_valid_format': True
+})
+_FILE_INFO_INVALID = MappingProxyType({
+    'file_path': 'secret.txt', 'file_size': 22, 'is_valid_format': False
+})
+
+
+class TestCLIBasics:
+    """Test top-level CLI behaviour."""
+    
+    @pytest.mark.parametrize("command", ['enroll', 'verify', 'encrypt', 'decrypt', 'info', 'setup'])
+    def test_help_lists_command(self, cli_help_text, command):
+        """Test that the help text lists each available command."""
+        assert command in cli_help_text
+    
+    @pytest.mark.parametrize("args,expected_output", [
+        (['--help'], ['Usage']),
+        (['--version'], ['1.0.0']),
+        ([], ['Usage']),
+    ], ids=["help", "version", "no-command"])
+    def test_cli_flag(self, runner, args, expected_output):
+        """Test help, version and bare invocation output."""
+        result = runner.invoke(cli, args)
+        
+        assert result.exit_code == 0
+        for text in expected_output:
+            assert text in result.output
+
+
+class TestEnrollmentCommands:
+    """Test the enroll command."""
+    
+    @pytest.mark.parametrize("outcome,expected_exit,expected_output", [
+        (_ENROLL_OK, 0, ["User 'alice' enrolled successfully"]),
+        (_ENROLL_FAILED, 1, ['Enrollment failed']),
+        (FaceEnrollmentError("Camera not available"), 1,
+         ['Enrollment Error: Camera not available', 'Common solutions']),
+    ], ids=["success", "failure", "error"])
+    def test_enroll(self, runner, enroller_mock, outcome, expected_exit, expected_output):
+        """Test enroll output for success, unsuccessful and error results."""
+        # A one-item side_effect list returns a result dict or raises an exception
+        enroller_mock.enroll_new_user.side_effect = [outcome]
+        
+        result = runner.invoke(cli, ['enroll', '--user-id', 'alice'])
+        
+        assert result.exit_code == expected_exit
+        for text in expected_output:
+            assert text in result.output
+        enroller_mock.enroll_new_user.assert_called_once_with('alice')
+    
+    def test_enroll_passes_options(self, enroller_mock):
+        """Test that model and data directory options reach FaceEnroller."""
+        enroller_mock.enroll_new_user.return_value = _ENROLL_OK
+        
+        # Call the command callback directly; option parsing is not under test
+        enroll_face.callback(user_id='alice', model='ArcFace', data_dir='custom_data')
+        
+        enrollment.FaceEnroller.assert_called_once_with(model_name='ArcFace', data_dir='custom_data')
+    
+    def test_enroll_keyboard_interrupt(self, enroller_mock, capsys):
+        """Test that Ctrl+C during enrollment exits cleanly with a message."""
+        enroller_mock.enroll_new_user.side_effect = KeyboardInterrupt
+        
+        with pytest.raises(SystemExit) as exc_info:
+            enroll_face.callback(user_id='alice', model='Facenet', data_dir='face_data')
+        
+        assert exc_info.value.code == 1
+        assert 'Enrollment cancelled by user' in capsys.readouterr().out
+    
+    def test_enroll_missing_dependencies(self, runner, monkeypatch):
+        """Test that a failed enrollment import reports missing dependencies."""
+        # A None entry makes "from faceauth.enrollment import ..." raise ImportError
+        monkeypatch.setitem(sys.modules, 'faceauth.enrollment', None)
+        
+        result = runner.invoke(cli, ['enroll', '--user-id', 'alice'])
+        
+        assert result.exit_code == 1
+        assert 'Missing dependencies' in result.output
+    
+    def test_enroll_interrupted_during_import(self, runner, monkeypatch):
+        """Test that Ctrl-C while the enrollment module loads reports a cancellation."""
+        class InterruptingFinder:
+            def find_spec(self, name, path=None, target=None):
+                if name == 'faceauth.enrollment':
+                    raise KeyboardInterrupt
+                return None
+        
+        monkeypatch.delitem(sys.modules, 'faceauth.enrollment')
+        monkeypatch.setattr(sys, 'meta_path', [InterruptingFinder()] + sys.meta_path)
+        
+        result = runner.invoke(cli, ['enroll', '--user-id', 'alice'])
+        
+        assert result.exit_code == 1
+        assert 'Enrollment cancelled by user' in result.output
+
+
+class TestAuthenticationCommands:
+    """Test the verify command."""
+    
+    @pytest.mark.parametrize("outcome,expected_exit,expected_output", [
+        (True, 0, 'ACCESS GRANTED'),
+        (False, 1, 'ACCESS DENIED'),
+        (FaceAuthenticationError("No face data found"), 1,
+         'Authentication Error: No face data found'),
+    ], ids=["success", "failure", "error"])
+    def test_verify(self, runner, authenticator_mock, outcome, expected_exit, expected_output):
+        """Test verify output for granted, denied and error results."""
+        authenticator_mock.verify_user_face.side_effect = [outcome]
+        
+        result = runner.invoke(cli, ['verify', '--user-id', 'alice'])
+        
+        assert result.exit_code == expected_exit
+        assert expected_output in result.output
+        authenticator_mock.verify_user_face.assert_called_once_with('alice')
+    
+    def test_verify_passes_options(self, authenticator_mock):
+        """Test that model and data directory options reach FaceAuthenticator."""
+        authenticator_mock.verify_user_face.return_value = True
+        
+        verify_face.callback(user_id='alice', model='ArcFace', data_dir='custom_data')
+        
+        authentication.FaceAuthenticator.assert_called_once_with(model_name='ArcFace', data_dir='custom_data')
+
+
+class TestFileEncryptionCommands:
+    """Test the encrypt and decrypt commands."""
+    
+    @pytest.fixture(scope="class")
+    def _file_patches(self):
+        """Patch password prompts and file_handler operations once for the class."""
+        with patch.multiple('faceauth.file_handler', encrypt_file=DEFAULT,
+                            decrypt_file=DEFAULT, get_encrypted_file_info=DEFAULT) as mocks, \
+             patch('getpass.getpass') as mock_getpass:
+            mocks['getpass'] = mock_getpass
+            yield mocks
+    
+    @pytest.fixture(autouse=True)
+    def setup_files(self, tmp_path, _file_patches):
+        """Set up a plaintext file and its encrypted counterpart, and reset the mocks."""
+        self.test_file = tmp_path / "secret.txt"
+        self.test_file.write_bytes(b"FaceAuth CLI test data")
+        self.encrypted_file = tmp_path / "secret.txt.faceauth"
+        self.encrypted_file.write_bytes(b"encrypted")
+        self.mocks = _file_patches
+        yield
+        for mock in _file_patches.values():
+            mock.reset_mock(return_value=True, side_effect=True)
+    
+    def test_encrypt_file(self, runner, stub_authenticator):
+        """Test encrypting a file after successful face verification."""
+        stub_authenticator(True)
+        self.mocks['getpass'].return_value = "file_password"
+        self.mocks['encrypt_file'].return_value = str(self.encrypted_file)
+        
+        result = runner.invoke(cli, ['encrypt', str(self.test_file), '--user-id', 'alice'], input='n\n')
+        
+        assert result.exit_code == 0, result.output
+        assert 'ENCRYPTION SUCCESSFUL' in result.output
+        self.mocks['encrypt_file'].assert_called_once_with(str(self.test_file), "file_password")
+        assert self.test_file.exists()  # Original kept when deletion is declined
+    
+    def test_decrypt_file(self, runner, stub_authenticator):
+        """Test decrypting a file after successful face verification."""
+        stub_authenticator(True)
+        self.mocks['getpass'].return_value = "file_password"
+        self.mocks['get_encrypted_file_info'].return_value = _FILE_INFO_VALID
+        self.mocks['decrypt_file'].return_value = str(self.test_file)
+        
+        result = runner.invoke(cli, ['decrypt', str(self.encrypted_file), '--output', str(self.test_file),
+                                     '--user-id', 'alice'])
+        
+        assert result.exit_code == 0, result.output
+        assert 'DECRYPTION SUCCESSFUL' in result.output
+        self.mocks['decrypt_file'].assert_called_once_with(
+            str(self.encrypted_file), "file_password", str(self.test_file)
+        )
+    
+    @pytest.mark.parametrize("command,file_attr,operation", [
+        ('encrypt', 'test_file', 'encrypt_file'),
+        ('decrypt', 'encrypted_file', 'decrypt_file'),
+    ])
+    def test_authentication_failure(self, runner, stub_authenticator, command, file_attr, operation):
+        """Test that encryption and decryption stop when face verification fails."""
+        stub_authenticator(False)
+        self.mocks['get_encrypted_file_info'].return_value = _FILE_INFO_VALID
+        
+        result = runner.invoke(cli, [command, str(getattr(self, file_attr)), '--user-id', 'alice'])
+        
+        assert result.exit_code == 1
+        assert 'AUTHENTICATION FAILED' in result.output
+        self.mocks['getpass'].assert_not_called()
+        self.mocks[operation].assert_not_called()
+    
+    def test_encrypt_password_mismatch(self, runner, stub_authenticator):
+        """Test that mismatched passwords abort encryption."""
+        stub_authenticator(True)
+        self.mocks['getpass'].side_effect = ["first_password", "second_password"]
+        
+        result = runner.invoke(cli, ['encrypt', str(self.test_file), '--user-id', 'alice'])
+        
+        assert result.exit_code == 1
+        assert 'Passwords do not match' in result.output
+        self.mocks['encrypt_file'].assert_not_called()
+    
+    def test_decrypt_invalid_file(self, runner, authenticator_mock):
+        """Test that decrypting a non-FaceAuth file is rejected before authentication."""
+        self.mocks['get_encrypted_file_info'].return_value = _FILE_INFO_INVALID
+        
+        result = runner.invoke(cli, ['decrypt', str(self.test_file)], input='y\n')
+        
+        assert result.exit_code == 1
+        assert 'Invalid .faceauth file format' in result.output
+        authenticator_mock.verify_user_face.assert_not_called()
+
+
+class TestInfoCommand:
+    """Test the info command."""
+    
+    def test_info_without_face_data(self, runner):
+        """Test info output before any user is enrolled."""
+        result = runner.invoke(cli, ['info'])
+        
+        assert result.exit_code == 0
+        assert 'Not created yet' in result.output
+        assert 'Enrolled users: 0' in result.output
+    
+    def test_info_counts_enrolled_users(self, runner, tmp_path):
+        """Test that info counts the enrolled face data files."""
+        face_data = tmp_path / "face_data"
+        face_data.mkdir()
+        for name in ('a', 'b'):
+            (face_data / f"{name}_face.dat").write_bytes(b"")
+        
+        result = runner.invoke(cli, ['info'])
+        
+        assert result.exit_code == 0
+        assert 'Enrolled users: 2' in result.output
+
+
+if __name__ == "__main__":
+    # Allow running tests directly
+    pytest.main([__file__, "-v"])
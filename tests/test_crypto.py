@@ -11,20 +11,20 @@ Tests for the cryptographic functions in crypto.py, focusing on:
 
 import pytest
 import numpy as np
+import hashlib
+import itertools
 import os
-import tempfile
 import shutil
-from pathlib import Path
-from unittest.mock import patch, mock_open
-
-# Import the modules under test
 import sys
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pickle
+from pathlib import Path
+from unittest.mock import patch
 
 from faceauth.crypto import (
     generate_key_from_password,
     encrypt_embedding,
     decrypt_embedding,
+    decrypt_embedding_with_key,
     encrypt_embedding_with_password,
     generate_user_hash,
     verify_embedding_integrity,
@@ -33,6 +33,18 @@ from faceauth.crypto import (
 )
 
 
+# Arena of mock embeddings generated once for the whole module with a single
+# RNG call; tests take read-only row views instead of drawing fresh data
+_ARENA = np.random.default_rng(0).random((64, 2048), dtype=np.float32)
+_ARENA.flags.writeable = False
+_ARENA_ROWS = itertools.count()
+
+
+def _emb(size: int = 512) -> np.ndarray:
+    """Return a read-only mock embedding of the given size (a view into the arena)."""
+    return _ARENA[next(_ARENA_ROWS) % len(_ARENA), :size]
+
+
 class TestCryptoBasics:
     """Test basic cryptographic operations."""
     
@@ -59,7 +71,7 @@ class TestCryptoBasics:
     def test_encrypt_decrypt_roundtrip(self):
         """Test that encryption followed by decryption returns original data."""
         # Create sample embedding (simulating DeepFace output)
-        original_embedding = np.random.rand(512).astype(np.float32)
+        original_embedding = _emb()
         password = "secure_password_456"
         
         # Encrypt the embedding
@@ -77,9 +89,46 @@ class TestCryptoBasics:
         assert decrypted_embedding.shape == original_embedding.shape
         assert np.allclose(original_embedding, decrypted_embedding, rtol=1e-6)
     
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_roundtrip_preserves_dtype_and_is_writable(self, dtype, encryption_key):
+        """Test that raw serialization keeps the dtype and returns a writable array."""
+        original_embedding = _emb().astype(dtype)
+        
+        encrypted_payload = encrypt_embedding(original_embedding, encryption_key)
+        decrypted_embedding = decrypt_embedding_with_key(encrypted_payload, encryption_key)
+        
+        assert decrypted_embedding.dtype == dtype
+        assert np.array_equal(original_embedding, decrypted_embedding)
+        decrypted_embedding /= 2.0  # Callers may normalise in place
+    
+    def test_decrypt_into_preallocated_array(self, encryption_key):
+        """Test that decryption can write into a caller-provided array."""
+        original_embedding = _emb()
+        encrypted_payload = encrypt_embedding(original_embedding, encryption_key)
+        out = np.empty(512, dtype=np.float32)
+        
+        result = decrypt_embedding_with_key(encrypted_payload, encryption_key, out=out)
+        
+        assert result is out
+        assert np.array_equal(out, original_embedding)
+        
+        with pytest.raises(CryptoError, match="Output array has shape"):
+            decrypt_embedding_with_key(encrypted_payload, encryption_key, out=np.empty(128, dtype=np.float32))
+    
+    def test_decrypt_legacy_pickle_payload(self, encryption_key):
+        """Test that embeddings stored in the original pickle format still decrypt."""
+        original_embedding = _emb()
+        
+        with patch('faceauth.crypto._serialize_embedding', side_effect=pickle.dumps):
+            legacy_payload = encrypt_embedding(original_embedding, encryption_key)
+        
+        decrypted_embedding = decrypt_embedding_with_key(legacy_payload, encryption_key)
+        
+        assert np.array_equal(original_embedding, decrypted_embedding)
+    
     def test_decryption_with_wrong_password(self):
         """Test that wrong password raises CryptoError."""
-        original_embedding = np.random.rand(128).astype(np.float32)
+        original_embedding = _emb(128)
         correct_password = "correct_password"
         wrong_password = "wrong_password"
         
@@ -107,10 +156,16 @@ class TestCryptoBasics:
         assert len(hash1) == 64  # SHA-256 produces 64 hex characters
         int(hash1, 16)  # Should not raise exception
     
+    def test_user_hash_is_sha256_of_user_id(self):
+        """Test that the user hash is the SHA-256 hex digest of the UTF-8 user ID."""
+        user_id = "hashed_user"
+        
+        assert generate_user_hash(user_id) == hashlib.sha256(user_id.encode('utf-8')).hexdigest()
+    
     def test_embedding_integrity_verification(self):
         """Test embedding validation function."""
         # Valid embedding
-        valid_embedding = np.random.rand(512).astype(np.float32)
+        valid_embedding = _emb()
         assert verify_embedding_integrity(valid_embedding) is True
         
         # Invalid cases
@@ -124,18 +179,15 @@ class TestCryptoBasics:
 class TestSecureEmbeddingStorage:
     """Test the SecureEmbeddingStorage class."""
     
-    def setup_method(self):
-        """Set up test environment with temporary directory."""
-        self.test_dir = tempfile.mkdtemp()
-        self.storage = SecureEmbeddingStorage(self.test_dir)
-        self.test_embedding = np.random.rand(512).astype(np.float32)
+    @pytest.fixture(autouse=True)
+    def setup_storage(self, secure_storage):
+        """Set up test environment with a per-test storage directory."""
+        self.storage = secure_storage
+        self.test_dir = secure_storage.storage_dir
+        self.test_embedding = _emb()
         self.user_id = "test_user"
         self.password = "test_password"
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     def test_save_and_load_embedding(self):
         """Test saving and loading user embeddings."""
         # Save embedding
@@ -163,11 +215,38 @@ class TestSecureEmbeddingStorage:
         # User should now exist
         assert self.storage.user_exists(self.user_id)
     
+    def test_user_exists_after_external_deletion(self):
+        """Test that a user file deleted outside this instance is no longer reported."""
+        filepath = self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        assert self.storage.user_exists(self.user_id)
+        
+        os.remove(filepath)
+        
+        assert not self.storage.user_exists(self.user_id)
+        with pytest.raises(CryptoError, match="No face data found"):
+            self.storage.load_user_embedding(self.user_id, self.password)
+    
+    def test_user_exists_sees_other_instances(self):
+        """Test that users enrolled through another storage instance are found."""
+        other_storage = SecureEmbeddingStorage(self.test_dir)
+        assert not self.storage.user_exists(self.user_id)
+        
+        other_storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        
+        assert self.storage.user_exists(self.user_id)
+    
     def test_load_nonexistent_user(self):
         """Test loading embedding for user that doesn't exist."""
         with pytest.raises(CryptoError, match="No face data found"):
             self.storage.load_user_embedding("nonexistent_user", self.password)
     
+    def test_load_with_missing_storage_dir(self):
+        """Test loading when the storage directory was removed after setup."""
+        shutil.rmtree(self.test_dir)
+        
+        with pytest.raises(CryptoError, match="No face data found"):
+            self.storage.load_user_embedding(self.user_id, self.password)
+    
     def test_load_with_wrong_password(self):
         """Test loading embedding with incorrect password."""
         # Save embedding
@@ -177,6 +256,52 @@ class TestSecureEmbeddingStorage:
         with pytest.raises(CryptoError, match="Decryption failed"):
             self.storage.load_user_embedding(self.user_id, "wrong_password")
     
+    def test_load_reuses_derived_key(self):
+        """Test that loading after saving does not re-run key derivation."""
+        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        
+        with patch('faceauth.crypto.generate_key_from_password') as mock_kdf:
+            loaded_embedding = self.storage.load_user_embedding(self.user_id, self.password)
+        
+        mock_kdf.assert_not_called()
+        assert np.allclose(self.test_embedding, loaded_embedding, rtol=1e-6)
+    
+    def test_derived_key_shared_across_instances(self):
+        """Test that a key derived by one storage instance is reused by another."""
+        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        other_storage = SecureEmbeddingStorage(self.test_dir)
+        
+        with patch('faceauth.crypto.generate_key_from_password') as mock_kdf:
+            loaded_embedding = other_storage.load_user_embedding(self.user_id, self.password)
+        
+        mock_kdf.assert_not_called()
+        assert np.array_equal(self.test_embedding, loaded_embedding)
+    
+    def test_wrong_password_is_not_cached(self):
+        """Test that a wrong password always derives a key and never populates the cache."""
+        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        cached_keys = dict(self.storage._key_cache)
+        
+        for _ in range(2):
+            with patch('faceauth.crypto.generate_key_from_password',
+                       wraps=generate_key_from_password) as mock_kdf:
+                with pytest.raises(CryptoError, match="Decryption failed"):
+                    self.storage.load_user_embedding(self.user_id, "wrong_password")
+            mock_kdf.assert_called_once()
+        
+        assert self.storage._key_cache == cached_keys
+    
+    def test_clear_key_cache(self):
+        """Test that clearing the key cache forces key derivation on the next load."""
+        self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
+        self.storage.clear_key_cache()
+        
+        with patch('faceauth.crypto.generate_key_from_password',
+                   wraps=generate_key_from_password) as mock_kdf:
+            self.storage.load_user_embedding(self.user_id, self.password)
+        
+        mock_kdf.assert_called_once()
+    
     def test_save_invalid_embedding(self):
         """Test saving invalid embedding data."""
         invalid_embedding = np.zeros(512)  # All zeros - invalid
@@ -191,12 +316,41 @@ class TestSecureEmbeddingStorage:
             self.storage.save_user_embedding(self.user_id, self.test_embedding, self.password)
 
 
+class TestCryptoBackend:
+    """Test that encryption runs on the OpenSSL-backed cipher implementation."""
+    
+    def test_aes_gcm_uses_openssl_backend(self):
+        """Test that AES-256-GCM comes from cryptography's OpenSSL EVP bindings."""
+        from cryptography.hazmat.backends.openssl import backend
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        import faceauth.crypto as crypto
+        
+        # The module must use cryptography's primitives, not a pure-Python fallback
+        assert crypto.Cipher is Cipher
+        assert crypto.algorithms.AES is algorithms.AES
+        assert crypto.modes.GCM is modes.GCM
+        assert crypto.AESGCM is AESGCM
+        
+        assert backend.openssl_version_text().startswith(("OpenSSL", "LibreSSL", "BoringSSL"))
+        assert backend.cipher_supported(algorithms.AES(bytes(32)), modes.GCM(bytes(12)))
+    
+    def test_aead_output_decrypts_with_streaming_cipher(self, encryption_key):
+        """Test that one-shot AESGCM output keeps the nonce + ciphertext + tag layout."""
+        embedding = _emb(128)
+        payload = encrypt_embedding(embedding, encryption_key)
+        
+        # 12-byte nonce, serialized embedding, 16-byte tag
+        assert len(payload) == 12 + 8 + embedding.nbytes + 16
+        np.testing.assert_array_equal(decrypt_embedding_with_key(payload, encryption_key), embedding)
+
+
 class TestCryptoErrorHandling:
     """Test error handling in crypto operations."""
     
     def test_corrupt_encrypted_data(self):
         """Test handling of corrupted encryption data."""
-        embedding = np.random.rand(128).astype(np.float32)
+        embedding = _emb(128)
         password = "test_password"
         
         # Encrypt normally
@@ -212,7 +366,7 @@ class TestCryptoErrorHandling:
     
     def test_truncated_encrypted_data(self):
         """Test handling of truncated encryption data."""
-        embedding = np.random.rand(128).astype(np.float32)
+        embedding = _emb(128)
         password = "test_password"
         
         # Encrypt normally
@@ -227,7 +381,7 @@ class TestCryptoErrorHandling:
     
     def test_empty_password(self):
         """Test handling of empty password."""
-        embedding = np.random.rand(128).astype(np.float32)
+        embedding = _emb(128)
         
         # Empty password should still work (though not recommended)
         encrypted_data = encrypt_embedding_with_password(embedding, "")
@@ -239,24 +393,21 @@ class TestCryptoErrorHandling:
 class TestCryptoPerformance:
     """Test crypto operations performance and behavior."""
     
-    def test_different_embedding_sizes(self):
+    @pytest.mark.parametrize("size", [128, 256, 512, 1024, 2048])
+    def test_different_embedding_sizes(self, size, encryption_key):
         """Test encryption with different embedding sizes."""
-        sizes = [128, 256, 512, 1024, 2048]
-        password = "test_password"
+        embedding = _emb(size)
+        
+        # Should work for all common embedding sizes
+        encrypted_payload = encrypt_embedding(embedding, encryption_key)
+        decrypted_embedding = decrypt_embedding_with_key(encrypted_payload, encryption_key)
         
-        for size in sizes:
-            embedding = np.random.rand(size).astype(np.float32)
-            
-            # Should work for all common embedding sizes
-            encrypted_data = encrypt_embedding_with_password(embedding, password)
-            decrypted_embedding = decrypt_embedding(encrypted_data, password)
-            
-            assert np.allclose(embedding, decrypted_embedding, rtol=1e-6)
+        assert np.allclose(embedding, decrypted_embedding, rtol=1e-6)
     
     def test_multiple_users_same_password(self):
         """Test that same password produces different encrypted data for different users."""
         password = "shared_password"
-        embedding = np.random.rand(512).astype(np.float32)
+        embedding = _emb()
         
         # Encrypt same embedding with same password multiple times
         encrypted1 = encrypt_embedding_with_password(embedding, password)
@@ -273,6 +424,29 @@ class TestCryptoPerformance:
         assert np.allclose(embedding, decrypted1, rtol=1e-6)
 
 
+class TestPackageImports:
+    """Test that the faceauth package keeps crypto imports lightweight."""
+    
+    def test_crypto_import_does_not_load_deepface(self):
+        """Test that importing faceauth.crypto does not import DeepFace."""
+        import subprocess
+        code = "import sys, faceauth.crypto; print('deepface' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, cwd=str(Path(__file__).parent.parent))
+        
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "False"
+    
+    def test_lazy_package_exports(self):
+        """Test that package-level names resolve to their submodule objects."""
+        import faceauth
+        
+        assert faceauth.SecureEmbeddingStorage is SecureEmbeddingStorage
+        assert faceauth.CryptoError is CryptoError
+        with pytest.raises(AttributeError):
+            faceauth.does_not_exist
+
+
 if __name__ == "__main__":
     # Allow running tests directly
     pytest.main([__file__, "-v"])
@@ -12,21 +12,28 @@ Tests for face enrollment functionality in enrollment.py, focusing on:
 import pytest
 import numpy as np
 import os
-import tempfile
-import shutil
 import cv2
+from contextlib import ExitStack
 from pathlib import Path
-from unittest.mock import patch, MagicMock, mock_open
-
-# Import the modules under test
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from unittest.mock import patch, MagicMock
 
 from faceauth.enrollment import (
     FaceEnroller,
     FaceEnrollmentError
 )
 from faceauth.crypto import SecureEmbeddingStorage
+from tests._helpers import create_test_frame
+
+
+# Module-level patch targets entered together through a single ExitStack
+ENROLLMENT_WORKFLOW_PATCHES = {
+    'getpass': 'faceauth.enrollment.getpass.getpass',
+    'waitKey': 'faceauth.enrollment.cv2.waitKey',
+    'imshow': 'faceauth.enrollment.cv2.imshow',
+    'destroyAllWindows': 'faceauth.enrollment.cv2.destroyAllWindows',
+    'represent': 'faceauth.enrollment.DeepFace.represent',
+    'sleep': 'faceauth.enrollment.time.sleep',
+}
 
 
 class TestFaceEnrollerInit:
@@ -105,7 +112,7 @@ class TestFaceDetection:
         """Set up test environment."""
         with patch('faceauth.enrollment.Path.mkdir'):
             self.enroller = FaceEnroller()
-        self.mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        self.mock_frame = create_test_frame()
     
     @patch('enrollment.DeepFace.extract_faces')
     def test_detect_faces_single_face_success(self, mock_extract_faces):
@@ -178,7 +185,7 @@ class TestFaceEmbeddingGeneration:
         """Set up test environment."""
         with patch('faceauth.enrollment.Path.mkdir'):
             self.enroller = FaceEnroller()
-        self.mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        self.mock_frame = create_test_frame()
     
     @patch('enrollment.DeepFace.represent')
     def test_generate_face_embedding_success(self, mock_represent):
@@ -201,57 +208,57 @@ class TestFaceEmbeddingGeneration:
 class TestEnrollmentWorkflow:
     """Test complete enrollment workflow."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
+    @pytest.fixture(autouse=True)
+    def setup_storage(self, tmp_path):
+        """Set up test environment in a pytest-managed temporary directory."""
+        self.test_dir = str(tmp_path)
         with patch('faceauth.enrollment.Path.mkdir'):
             self.enroller = FaceEnroller(data_dir=self.test_dir)
         
         self.user_id = "test_enrollment_user"
         self.password = "enrollment_password"
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
-    @patch('enrollment.getpass.getpass')
-    @patch('enrollment.cv2.waitKey')
-    @patch('enrollment.cv2.imshow')
-    @patch('enrollment.cv2.destroyAllWindows')
-    @patch.object(FaceEnroller, '_initialize_camera')
-    @patch.object(FaceEnroller, '_detect_faces')
-    @patch('enrollment.DeepFace.represent')
-    @patch('enrollment.time.sleep')
-    def test_enroll_user_success_workflow(self, mock_sleep, mock_represent, mock_detect_faces, 
-                                        mock_init_camera, mock_destroy_windows, mock_imshow, 
-                                        mock_waitkey, mock_getpass):
+    def test_enroll_user_success_workflow(self, mock_embedding):
         """Test complete successful enrollment workflow."""
-        # Mock password input
-        mock_getpass.return_value = self.password
-        
-        # Mock camera initialization
-        mock_cap = MagicMock()
-        mock_cap.read.return_value = (True, np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8))
-        mock_init_camera.return_value = mock_cap
-        
-        # Mock face detection - successful on first try
-        mock_detect_faces.return_value = (True, "✅ Face detected and ready for capture!", [])
-        
-        # Mock key press to trigger capture (SPACE key = 32)
-        mock_waitkey.return_value = 32
-        
-        # Mock DeepFace embedding generation
-        mock_embedding = [np.random.rand(512).tolist()]
-        mock_represent.return_value = mock_embedding
-        
-        # Mock the enroll_user method (assuming it exists)
-        # This would be the actual test when the method is implemented
-        # result = self.enroller.enroll_user(self.user_id)
-        
-        # For now, just verify the mocks are set up correctly
-        assert mock_getpass is not None
-        assert mock_init_camera is not None
-        assert mock_detect_faces is not None
+        with ExitStack() as stack:
+            mocks = {name: stack.enter_context(patch(target))
+                     for name, target in ENROLLMENT_WORKFLOW_PATCHES.items()}
+            mocks['init_camera'] = stack.enter_context(patch.object(FaceEnroller, '_initialize_camera'))
+            mocks['detect_faces'] = stack.enter_context(patch.object(FaceEnroller, '_detect_faces'))
+            mocks['save'] = stack.enter_context(
+                patch.object(self.enroller.storage, 'save_user_embedding', return_value="saved_face.dat"))
+            
+            # Password and confirmation
+            mocks['getpass'].return_value = self.password
+            
+            # Camera always returns the cached test frame
+            mock_cap = MagicMock()
+            mock_cap.read.return_value = (True, create_test_frame())
+            mocks['init_camera'].return_value = mock_cap
+            
+            # One face detected on the first frame
+            mocks['detect_faces'].return_value = (True, "✅ Face detected and ready for capture!",
+                                                  [(200, 120, 240, 240)])
+            
+            # SPACE key triggers the capture
+            mocks['waitKey'].return_value = 32
+            
+            mocks['represent'].return_value = [{'embedding': mock_embedding.tolist()}]
+            
+            result = self.enroller.enroll_new_user(self.user_id)
+        
+        assert result['success'] is True
+        assert result['user_id'] == self.user_id
+        assert result['file_path'] == "saved_face.dat"
+        assert result['embedding_size'] == len(mock_embedding)
+        assert result['model_used'] == "Facenet"
+        
+        mocks['save'].assert_called_once()
+        saved_user_id, saved_embedding, saved_password = mocks['save'].call_args[0]
+        assert saved_user_id == self.user_id
+        assert saved_password == self.password
+        np.testing.assert_array_equal(saved_embedding, mock_embedding)
+        mock_cap.release.assert_called_once()
     
     @patch.object(FaceEnroller, '_initialize_camera', side_effect=FaceEnrollmentError("Camera error"))
     def test_enroll_user_camera_error(self, mock_init_camera):
@@ -271,9 +278,10 @@ class TestEnrollmentWorkflow:
 class TestSecureStorage:
     """Test secure storage of enrollment data."""
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
+    @pytest.fixture(autouse=True)
+    def setup_storage(self, tmp_path):
+        """Set up test environment in a pytest-managed temporary directory."""
+        self.test_dir = str(tmp_path)
         with patch('faceauth.enrollment.Path.mkdir'):
             self.enroller = FaceEnroller(data_dir=self.test_dir)
         
@@ -281,10 +289,6 @@ class TestSecureStorage:
         self.password = "storage_password"
         self.test_embedding = np.random.rand(512).astype(np.float32)
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     @patch('enrollment.encrypt_embedding_with_password')
     def test_store_face_embedding(self, mock_encrypt):
         """Test storing face embedding securely."""
@@ -333,7 +337,7 @@ class TestErrorHandling:
     def test_deepface_model_loading_error(self):
         """Test handling of DeepFace model loading errors."""
         with patch('faceauth.enrollment.DeepFace.extract_faces', side_effect=Exception("Model not found")):
-            mock_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+            mock_frame = create_test_frame()
             
             is_valid, message, face_regions = self.enroller._detect_faces(mock_frame)
             
@@ -10,15 +10,10 @@ Tests for file encryption/decryption functionality in file_handler.py, focusing
 """
 
 import pytest
+import hmac
 import os
-import tempfile
-import shutil
-from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock
-
-# Import the modules under test
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import uuid
+from unittest.mock import patch
 
 from faceauth.file_handler import (
     generate_file_key,
@@ -33,6 +28,22 @@ from faceauth.file_handler import (
 )
 
 
+def _unique_path(directory, name):
+    """Path inside a shared directory that cannot collide with other tests."""
+    return os.path.join(directory, f"{uuid.uuid4().hex}_{name}")
+
+
+@pytest.fixture(scope="module")
+def shared_tmp(tmp_path_factory):
+    """
+    One temporary directory for the whole module.
+
+    Tests create uniquely named files inside it instead of making and
+    removing a directory per test; pytest cleans the directory up itself.
+    """
+    return tmp_path_factory.mktemp("enc")
+
+
 class TestFileEncryptionBasics:
     """Test basic file encryption operations."""
     
@@ -70,6 +81,14 @@ class TestFileEncryptionBasics:
         key3, _ = derive_key_from_password(password, salt1)
         assert key1 == key3
     
+    def test_password_key_matches_crypto_module(self):
+        """Test that file keys are derived exactly like embedding keys."""
+        from faceauth.crypto import generate_key_from_password
+        salt = bytes(range(16))
+        
+        assert derive_key_from_password("test_password_123", salt) == \
+            generate_key_from_password("test_password_123", salt)
+    
     def test_file_key_encryption_decryption(self):
         """Test file key encryption/decryption with password-derived key."""
         file_key = generate_file_key()
@@ -91,10 +110,11 @@ class TestFileEncryptionBasics:
 class TestFileEncryptionRoundTrip:
     """Test complete file encryption/decryption workflows."""
     
-    def setup_method(self):
-        """Set up test environment with temporary directory."""
-        self.test_dir = tempfile.mkdtemp()
-        self.test_file = os.path.join(self.test_dir, "test_file.txt")
+    @pytest.fixture(autouse=True)
+    def setup_files(self, shared_tmp):
+        """Set up test environment in the shared module directory."""
+        self.test_dir = str(shared_tmp)
+        self.test_file = _unique_path(self.test_dir, "test_file.txt")
         self.encrypted_file = self.test_file + ".faceauth"
         self.password = "secure_password_123"
         
@@ -103,10 +123,6 @@ class TestFileEncryptionRoundTrip:
         with open(self.test_file, 'wb') as f:
             f.write(self.test_content)
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     def test_encrypt_decrypt_file_roundtrip(self):
         """Test complete file encryption and decryption process."""
         # Encrypt the file
@@ -120,7 +136,7 @@ class TestFileEncryptionRoundTrip:
         assert os.path.exists(self.test_file)
         
         # Decrypt the file
-        decrypted_file = os.path.join(self.test_dir, "decrypted_file.txt")
+        decrypted_file = _unique_path(self.test_dir, "decrypted_file.txt")
         decrypted_file_path = decrypt_file(encrypted_file_path, self.password, decrypted_file)
         
         # Verify decryption result
@@ -139,7 +155,7 @@ class TestFileEncryptionRoundTrip:
         assert os.path.exists(encrypted_file_path)
         
         # Try to decrypt with wrong password
-        decrypted_file = os.path.join(self.test_dir, "decrypted_file.txt")
+        decrypted_file = _unique_path(self.test_dir, "decrypted_file.txt")
         
         with pytest.raises(FileEncryptionError, match="Failed to decrypt file key"):
             decrypt_file(encrypted_file_path, "wrong_password", decrypted_file)
@@ -149,22 +165,22 @@ class TestFileEncryptionRoundTrip:
     
     def test_encrypt_nonexistent_file(self):
         """Test encryption of non-existent file."""
-        nonexistent_file = os.path.join(self.test_dir, "nonexistent.txt")
+        nonexistent_file = _unique_path(self.test_dir, "nonexistent.txt")
         
         with pytest.raises(FileEncryptionError, match="File not found"):
             encrypt_file(nonexistent_file, self.password)
     
     def test_decrypt_nonexistent_file(self):
         """Test decryption of non-existent encrypted file."""
-        nonexistent_file = os.path.join(self.test_dir, "nonexistent.faceauth")
-        output_file = os.path.join(self.test_dir, "output.txt")
+        nonexistent_file = _unique_path(self.test_dir, "nonexistent.faceauth")
+        output_file = _unique_path(self.test_dir, "output.txt")
         
         with pytest.raises(FileEncryptionError, match="Encrypted file not found"):
             decrypt_file(nonexistent_file, self.password, output_file)
     
     def test_encrypt_empty_file(self):
         """Test encryption of empty file."""
-        empty_file = os.path.join(self.test_dir, "empty.txt")
+        empty_file = _unique_path(self.test_dir, "empty.txt")
         with open(empty_file, 'wb') as f:
             f.write(b"")
         
@@ -173,7 +189,7 @@ class TestFileEncryptionRoundTrip:
         assert os.path.exists(encrypted_file_path)
         
         # Decrypt empty file
-        decrypted_file = os.path.join(self.test_dir, "decrypted_empty.txt")
+        decrypted_file = _unique_path(self.test_dir, "decrypted_empty.txt")
         decrypted_file_path = decrypt_file(encrypted_file_path, self.password, decrypted_file)
         
         assert os.path.exists(decrypted_file_path)
@@ -186,7 +202,7 @@ class TestFileEncryptionRoundTrip:
     def test_large_file_encryption(self):
         """Test encryption of larger file."""
         # Create a larger test file (1MB)
-        large_file = os.path.join(self.test_dir, "large_file.txt")
+        large_file = _unique_path(self.test_dir, "large_file.txt")
         large_content = b"X" * (1024 * 1024)  # 1MB of X's
         
         with open(large_file, 'wb') as f:
@@ -197,7 +213,7 @@ class TestFileEncryptionRoundTrip:
         assert os.path.exists(encrypted_file_path)
         
         # Decrypt large file
-        decrypted_file = os.path.join(self.test_dir, "decrypted_large.txt")
+        decrypted_file = _unique_path(self.test_dir, "decrypted_large.txt")
         decrypted_file_path = decrypt_file(encrypted_file_path, self.password, decrypted_file)
         
         assert os.path.exists(decrypted_file_path)
@@ -212,20 +228,17 @@ class TestFileEncryptionRoundTrip:
 class TestFileCorruption:
     """Test handling of corrupted encrypted files."""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_files(self, shared_tmp):
         """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.test_file = os.path.join(self.test_dir, "test.txt")
+        self.test_dir = str(shared_tmp)
+        self.test_file = _unique_path(self.test_dir, "test.txt")
         self.password = "test_password"
         
         # Create test file
         with open(self.test_file, 'wb') as f:
             f.write(b"Test content for corruption testing")
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     def test_corrupted_file_header(self):
         """Test handling of corrupted file header."""
         # Encrypt file first
@@ -237,7 +250,7 @@ class TestFileCorruption:
             f.write(b"CORRUPTED_HEADER")
         
         # Try to decrypt
-        output_file = os.path.join(self.test_dir, "output.txt")
+        output_file = _unique_path(self.test_dir, "output.txt")
         
         with pytest.raises(FileEncryptionError, match="Failed to decrypt file key"):
             decrypt_file(encrypted_file_path, self.password, output_file)
@@ -252,7 +265,7 @@ class TestFileCorruption:
             f.truncate(50)  # Cut to 50 bytes
         
         # Try to decrypt
-        output_file = os.path.join(self.test_dir, "output.txt")
+        output_file = _unique_path(self.test_dir, "output.txt")
         
         with pytest.raises(FileEncryptionError, match="Invalid encrypted file format"):
             decrypt_file(encrypted_file_path, self.password, output_file)
@@ -261,20 +274,17 @@ class TestFileCorruption:
 class TestFilePermissions:
     """Test file permission handling."""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_files(self, shared_tmp):
         """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.test_file = os.path.join(self.test_dir, "test.txt")
+        self.test_dir = str(shared_tmp)
+        self.test_file = _unique_path(self.test_dir, "test.txt")
         self.password = "test_password"
         
         # Create test file
         with open(self.test_file, 'wb') as f:
             f.write(b"Test content")
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     @patch('builtins.open', side_effect=PermissionError("Permission denied"))
     def test_file_permission_error_encrypt(self, mock_open):
         """Test handling of permission errors during encryption."""
@@ -285,7 +295,7 @@ class TestFilePermissions:
     def test_file_permission_error_decrypt(self, mock_open):
         """Test handling of permission errors during decryption."""
         encrypted_file = self.test_file + ".faceauth"
-        output_file = os.path.join(self.test_dir, "output.txt")
+        output_file = _unique_path(self.test_dir, "output.txt")
         
         with pytest.raises(FileEncryptionError, match="Cannot read encrypted file"):
             decrypt_file(encrypted_file, self.password, output_file)
@@ -294,18 +304,15 @@ class TestFilePermissions:
 class TestFilePathHandling:
     """Test various file path scenarios."""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_files(self, shared_tmp):
         """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = str(shared_tmp)
         self.password = "test_password"
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
     def test_file_with_spaces_in_name(self):
         """Test encryption/decryption of files with spaces in name."""
-        test_file = os.path.join(self.test_dir, "file with spaces.txt")
+        test_file = _unique_path(self.test_dir, "file with spaces.txt")
         content = b"Content in file with spaces"
         
         with open(test_file, 'wb') as f:
@@ -316,7 +323,7 @@ class TestFilePathHandling:
         assert os.path.exists(encrypted_file_path)
         
         # Decrypt
-        output_file = os.path.join(self.test_dir, "output with spaces.txt")
+        output_file = _unique_path(self.test_dir, "output with spaces.txt")
         decrypted_file_path = decrypt_file(encrypted_file_path, self.password, output_file)
         
         assert os.path.exists(decrypted_file_path)
@@ -328,7 +335,7 @@ class TestFilePathHandling:
     
     def test_file_with_unicode_name(self):
         """Test encryption/decryption of files with unicode characters."""
-        test_file = os.path.join(self.test_dir, "файл_тест_🔐.txt")
+        test_file = _unique_path(self.test_dir, "файл_тест_🔐.txt")
         content = b"Unicode filename test content"
         
         with open(test_file, 'wb') as f:
@@ -339,7 +346,7 @@ class TestFilePathHandling:
         assert os.path.exists(encrypted_file_path)
         
         # Decrypt
-        output_file = os.path.join(self.test_dir, "output_unicode.txt")
+        output_file = _unique_path(self.test_dir, "output_unicode.txt")
         decrypted_file_path = decrypt_file(encrypted_file_path, self.password, output_file)
         
         assert os.path.exists(decrypted_file_path)
@@ -368,6 +375,31 @@ class TestFilePathHandling:
         # Should pass for valid file
         is_valid = validate_encryption_integrity(self.test_file, self.password)
         assert is_valid is True
+    
+    def test_validate_encryption_integrity_uses_constant_time_compare(self):
+        """Test that the round-trip comparison goes through hmac.compare_digest."""
+        content = b"Integrity check content"
+        source = _unique_path(self.test_dir, "source.txt")
+        with open(source, 'wb') as f:
+            f.write(content)
+        
+        def fake_encrypt(path, password):
+            encrypted = path + ".faceauth"
+            with open(encrypted, 'wb') as f:
+                f.write(b"ciphertext")
+            return encrypted
+        
+        def fake_decrypt(path, password):
+            decrypted = _unique_path(self.test_dir, "decrypted.txt")
+            with open(decrypted, 'wb') as f:
+                f.write(content)
+            return decrypted
+        
+        with patch.multiple('faceauth.file_handler', encrypt_file=fake_encrypt, decrypt_file=fake_decrypt), \
+             patch('faceauth.file_handler.hmac.compare_digest', wraps=hmac.compare_digest) as mock_compare:
+            assert validate_encryption_integrity(source, self.password) is True
+        
+        mock_compare.assert_called_once_with(content, content)
 
 
 if __name__ == "__main__":